@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from openai import OpenAI
+
+from profiling import span
+from survey import DEFAULT_MAX_RETRIES, SURVEY_MODEL, call_with_retry, count_message_tokens
+
+# ---------------------------------------------------------
+# LIMITS
+# ---------------------------------------------------------
+# Requests and tokens (prompt + max completion) per minute, shared by every
+# user of the same API key and base URL. The defaults match a mid-tier
+# gpt-4o account; deployments override them with OPENAI_RPM / OPENAI_TPM.
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 450_000
+
+# Clients kept alive (each with its own connection pool), least recently used dropped first.
+MAX_CLIENTS = 64
+
+
+class TokenBucket:
+    """
+    Refills at `rate_per_minute`, holds at most one minute's worth. acquire()
+    blocks until the amount is available; an amount larger than the bucket
+    waits for a full bucket, so oversized requests still go through.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._available >= amount:
+                    self._available -= amount
+                    return
+                wait = (amount - self._available) / self.rate
+            time.sleep(wait)
+
+
+# ---------------------------------------------------------
+# CLIENTS
+# ---------------------------------------------------------
+class RateLimitedClient:
+    """
+    Wraps an OpenAI client: chat.completions.create() waits for the request
+    and token buckets, then retries 429/5xx/connection errors with jittered
+    backoff. Streaming calls are retried only until the stream is opened.
+    """
+
+    def __init__(self, client, requests, tokens, max_retries=DEFAULT_MAX_RETRIES):
+        self.client = client
+        self.requests = requests
+        self.tokens = tokens
+        self.max_retries = max_retries
+        self.base_url = str(client.base_url)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat_completion))
+
+    def _create_chat_completion(self, **kwargs):
+        cost = count_message_tokens(kwargs.get("messages", []), kwargs.get("model", SURVEY_MODEL))
+        cost += kwargs.get("max_tokens") or 0
+
+        def call():
+            # Every attempt counts against the limits, retries included.
+            with span("api.rate_limit_wait", tokens=cost):
+                self.requests.acquire(1)
+                self.tokens.acquire(cost)
+            return self.client.chat.completions.create(**kwargs)
+
+        return call_with_retry(call, max_retries=self.max_retries)
+
+
+class ClientPool:
+    """
+    One RateLimitedClient per (API key, base URL), shared across sessions and
+    jobs, so concurrent users of a key reuse its connections and draw on the
+    same rate limits. Keys are only held in memory, indexed by their hash.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+        max_retries=DEFAULT_MAX_RETRIES,
+        max_clients=MAX_CLIENTS,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key, base_url=None):
+        """Shared client for `api_key`; base_url=None uses OPENAI_BASE_URL or the OpenAI API."""
+        key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest(), base_url or "")
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = RateLimitedClient(
+                    # Retries happen in RateLimitedClient, where they also wait for the buckets.
+                    OpenAI(api_key=api_key, base_url=base_url or None, max_retries=0),
+                    TokenBucket(self.requests_per_minute),
+                    TokenBucket(self.tokens_per_minute),
+                    max_retries=self.max_retries,
+                )
+                self._clients[key] = client
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
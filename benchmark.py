@@ -0,0 +1,364 @@
+"""
+Benchmarks for the dashboard's hot paths.
+
+    python benchmark.py                       # bundled corpus + 1k/10k/100k synthetic papers
+    python benchmark.py --sizes 1000 --no-apptest
+    python benchmark.py --compare .cache/benchmarks/<earlier>.json
+
+Each case reports the best wall time per call over --repeat samples and the
+peak Python allocation (tracemalloc) of one extra call. Results are written as JSON to
+.cache/benchmarks/ so runs from different commits can be compared.
+"""
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+RESULTS_DIR = BASE_DIR / ".cache" / "benchmarks"
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# Synthetic corpora up to this size are also written to disk for the load
+# benchmark; larger ones are only built in memory.
+MAX_DISK_PAPERS = 10_000
+
+# Index builds that do not fit in memory or time at 100k papers: the BM25
+# index takes ~180 MB and the LSA build ~1 s per 1k papers. Larger
+# corpora skip them.
+MAX_SEARCH_PAPERS = 10_000
+MAX_SIMILARITY_PAPERS = 10_000
+
+# Summaries rendered per size (the renderer's cost is per paper).
+MAX_SUMMARY_PAPERS = 10_000
+
+# Minimum duration of one timing sample; faster calls are repeated within it.
+MIN_SAMPLE_SECONDS = 0.05
+
+# Relative change in time flagged by --compare.
+CHANGE_THRESHOLD = 0.25
+
+SEARCH_QUERIES = ["creativity", "graph OR network", "method:retrieval", '"hypothesis" llm']
+SURVEY_SELECTIONS = [10, 50]
+
+
+# ---------------------------------------------------------
+# MEASUREMENT
+# ---------------------------------------------------------
+def measure(fn, repeat=3):
+    """
+    (best seconds per call over `repeat` samples, peak MB of one traced call).
+    Calls faster than MIN_SAMPLE_SECONDS are looped within a sample, so
+    sub-millisecond cases are not dominated by timer noise.
+    """
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    first = time.perf_counter() - started
+    loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / first)) if first > 0 else 1000
+    best = first
+    for _ in range(max(0, repeat - 1) if loops == 1 else max(1, repeat)):
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1e6
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.corpus = "bundled"
+        self.results = []
+
+    def run(self, name, size, fn, repeat=None, **info):
+        seconds, peak_mb = measure(fn, self.repeat if repeat is None else repeat)
+        row = {
+            "name": name, "corpus": self.corpus, "size": size,
+            "seconds": round(seconds, 6), "peak_mb": round(peak_mb, 3), **info,
+        }
+        self.results.append(row)
+        print(f"{name:<36} {self.corpus:<9} {size:>8} {seconds * 1000:>11.2f} ms {peak_mb:>9.1f} MB", flush=True)
+        return row
+
+
+# ---------------------------------------------------------
+# CORPORA
+# ---------------------------------------------------------
+def synthetic_papers(base_papers, size, seed=0):
+    """
+    `size` paper records sampled from the bundled ones, with unique filenames,
+    titles and hashes and shuffled years and topics. full_data is attached
+    in memory, so no file is read for these records.
+    """
+    from corpus import load_full_data
+
+    rng = random.Random(seed)
+    all_topics = sorted({t for p in base_papers for t in p.get("topics", [])})
+    years = [str(y) for y in range(2020, 2027)]
+    papers = []
+    for i in range(size):
+        base = base_papers[i % len(base_papers)]
+        papers.append({
+            **{k: v for k, v in base.items() if k != "path"},
+            "title": f"{base['title']} ({i})",
+            "year": rng.choice(years),
+            "topics": rng.sample(all_topics, k=min(len(all_topics), rng.randint(1, 3))),
+            "filename": f"synthetic-{i:06d}.json",
+            "content_hash": f"{base['content_hash'][:48]}{i:016x}",
+            "full_data": load_full_data(base, cache=False),
+        })
+    return papers
+
+
+def write_synthetic_corpus(directory, papers):
+    for paper in papers:
+        data = dict(paper["full_data"], paper_title=paper["title"])
+        (Path(directory) / paper["filename"]).write_text(json.dumps(data), encoding="utf-8")
+
+
+# ---------------------------------------------------------
+# CASES
+# ---------------------------------------------------------
+def bench_loading(bench, directory, size):
+    from corpus import PaperCorpus
+
+    # What load_papers_from_directory does, then a refresh with nothing changed.
+    manifest = Path(tempfile.mkdtemp(prefix="exhyte-bench-")) / "manifest.json"
+    bench.run("load_papers (cold)", size, lambda: PaperCorpus(
+        str(directory), manifest_path=manifest
+    ).refresh(force=True), repeat=1)
+    corpus = PaperCorpus(str(directory), manifest_path=manifest)
+    corpus.refresh(force=True)
+    bench.run("load_papers (unchanged)", size, lambda: corpus.refresh(force=True))
+    shutil.rmtree(manifest.parent, ignore_errors=True)
+
+
+def bench_summaries(bench, papers, size):
+    from corpus import load_full_data
+    from summaries import generate_summary_html
+
+    sample = papers[:MAX_SUMMARY_PAPERS]
+    bench.run(
+        "generate_summary_html", size,
+        lambda: [generate_summary_html(load_full_data(p, cache=False)) for p in sample],
+        repeat=1, papers=len(sample),
+    )
+
+
+def bench_search(bench, papers, size):
+    from search_index import SearchIndex
+
+    if size > MAX_SEARCH_PAPERS:
+        return
+    bench.run("search_index build", size, lambda: SearchIndex().sync(papers), repeat=1)
+    index = SearchIndex()
+    index.sync(papers)
+    for query in SEARCH_QUERIES:
+        bench.run(f"keyword search {query!r}", size, lambda: index.search(query))
+
+
+def bench_facets(bench, papers, size):
+    from facets import FacetIndex
+
+    topics = sorted({t for p in papers for t in p.get("topics", [])})[:2]
+    selections = {"topic": topics, "year": ["2025"], "venue": [], "substage": []}
+    bench.run("facet index build", size, lambda: FacetIndex(papers), repeat=1)
+    facets = FacetIndex(papers)
+    bench.run("facet filter", size, lambda: facets.select(selections))
+    bench.run("facet counts (all facets)", size, lambda: [facets.counts(f, selections) for f in selections])
+    # The scan the facet index replaced, for reference.
+    bench.run("topic filter (linear scan)", size, lambda: [
+        p for p in papers if any(t in p.get("topics", []) for t in topics) and p.get("year") == "2025"
+    ])
+
+
+def bench_paper_payloads(bench, papers, size):
+    from facets import FacetIndex
+    from paper_payload import build_paper_payload, build_search_payload, compact_json
+    from search_index import SearchIndex
+
+    if size > MAX_SEARCH_PAPERS:
+        return
+    facets = FacetIndex(papers)
+    index = SearchIndex()
+    index.sync(papers)
+    bench.run(
+        "paper payload build", size, lambda: build_paper_payload(papers, facets), repeat=1,
+        bytes=len(compact_json(build_paper_payload(papers, facets)).encode("utf-8")),
+    )
+    bench.run(
+        "search payload build", size, lambda: build_search_payload(index, papers), repeat=1,
+        bytes=len(compact_json(build_search_payload(index, papers)).encode("utf-8")),
+    )
+
+
+def bench_similarity(bench, papers, size):
+    from similarity import SimilarityIndex
+
+    if size > MAX_SIMILARITY_PAPERS:
+        return
+    bench.run("similarity build", size, lambda: SimilarityIndex(papers), repeat=1)
+    index = SimilarityIndex(papers)
+    key = index.keys[0]
+    bench.run("similarity related", size, lambda: index.related(key, 5))
+    bench.run("similarity search", size, lambda: index.search("hypothesis generation with language models", 20))
+
+
+def bench_survey_prompts(bench, papers):
+    from corpus import load_full_data
+    from survey import build_survey_messages, pack_survey_prompt
+
+    for count in SURVEY_SELECTIONS:
+        objects = [load_full_data(p, cache=False) for p in papers[:count]]
+        bench.run("build_survey_messages", count, lambda: build_survey_messages(objects, compact=True))
+        bench.run("pack_survey_prompt", count, lambda: pack_survey_prompt(objects), repeat=1)
+
+
+def bench_pages(bench):
+    from exhyte_pages import FILES, available_images, build_image_map, content_hash, process_html_content
+    from image_variants import image_variants
+
+    images = available_images()
+    bench.run(
+        "image variants (cached)", len(images),
+        lambda: [image_variants(path, content_hash(path)) for path in images.values()],
+    )
+    image_map, _ = build_image_map("inline")
+    for key, name in FILES.items():
+        path = BASE_DIR / name
+        if path.is_file():
+            html = path.read_text(encoding="utf-8")
+            bench.run(f"process_html_content {key}", len(html), lambda: process_html_content(html, image_map), repeat=1)
+
+
+def bench_apptest(bench):
+    """Full-script runs of streamlit_app.py, headless."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(BASE_DIR / "streamlit_app.py"), default_timeout=120)
+    bench.run("apptest first run", 1, lambda: app.run(), repeat=1)
+
+    def rerun(tab, action=None):
+        def go():
+            app.session_state["active_tab"] = tab
+            if action:
+                action()
+            app.run()
+        return go
+
+    for tab in ["Paper List", "Workflow Statistics", "Survey Generator"]:
+        bench.run(f"apptest rerun {tab}", 1, rerun(tab))
+
+
+# ---------------------------------------------------------
+# REPORT
+# ---------------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    baseline = {
+        (row["name"], row["corpus"], row["size"]): row
+        for row in json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    }
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        old = baseline.get((row["name"], row["corpus"], row["size"]))
+        if old and old["seconds"]:
+            ratio = row["seconds"] / old["seconds"]
+            flag = "  slower" if ratio > 1 + CHANGE_THRESHOLD else ("  faster" if ratio < 1 - CHANGE_THRESHOLD else "")
+            print(f"{row['name']:<36} {row['corpus']:<9} {row['size']:>8} {ratio:>6.2f}x time {row['peak_mb'] - old['peak_mb']:>+9.1f} MB{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES, help="synthetic corpus sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is kept)")
+    parser.add_argument("--no-apptest", action="store_true", help="skip the full-script AppTest runs")
+    parser.add_argument("--output", type=Path, help="result file (default: .cache/benchmarks/<time>-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    from corpus import PaperCorpus, resolve_papers_directory
+
+    bench = Bench(args.repeat)
+    print(f"{'case':<36} {'corpus':<9} {'size':>8} {'time':>14} {'peak':>12}")
+
+    papers_dir = resolve_papers_directory("Papers")
+    papers = PaperCorpus("Papers").refresh(force=True)
+    bench_loading(bench, papers_dir, len(papers))
+    bench_summaries(bench, papers, len(papers))
+    bench_search(bench, papers, len(papers))
+    bench_facets(bench, papers, len(papers))
+    bench_paper_payloads(bench, papers, len(papers))
+    bench_similarity(bench, papers, len(papers))
+    bench_survey_prompts(bench, papers)
+    bench_pages(bench)
+
+    bench.corpus = "synthetic"
+    for size in args.sizes:
+        synthetic = synthetic_papers(papers, size)
+        if size <= MAX_DISK_PAPERS:
+            directory = Path(tempfile.mkdtemp(prefix="exhyte-bench-"))
+            try:
+                write_synthetic_corpus(directory, synthetic)
+                bench_loading(bench, directory, size)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        bench_summaries(bench, synthetic, size)
+        bench_search(bench, synthetic, size)
+        bench_facets(bench, synthetic, size)
+        bench_paper_payloads(bench, synthetic, size)
+        bench_similarity(bench, synthetic, size)
+        del synthetic
+
+    if not args.no_apptest:
+        bench.corpus = "app"
+        bench_apptest(bench)
+
+    commit = git_commit()
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "commit": commit,
+            "created_at": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+        },
+        "results": bench.results,
+    }, indent=2), encoding="utf-8")
+    print(f"\nWrote {output}")
+    if args.compare:
+        compare(bench.results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
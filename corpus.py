@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from profiling import span
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+# ---------------------------------------------------------
+# PATHS
+# ---------------------------------------------------------
+def resolve_papers_directory(directory_name="Papers"):
+    cwd_directory = Path.cwd() / directory_name
+    base_directory = BASE_DIR / directory_name
+    for directory in (cwd_directory, base_directory):
+        if directory.exists() and directory.is_dir():
+            return directory
+    return base_directory
+
+
+def file_signature(file_path):
+    """(mtime_ns, size) pair used to decide whether a file must be reparsed."""
+    stat = file_path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# ---------------------------------------------------------
+# PARSING
+# ---------------------------------------------------------
+def parse_paper(file_path):
+    """
+    Read one summary JSON and build the paper record used by the dashboard.
+    Only metadata stays resident; the full JSON is reread by load_full_data().
+    """
+    raw = file_path.read_bytes()
+    data = json.loads(raw.decode("utf-8"))
+
+    raw_authors = data.get("authors", [])
+    authors_str = ", ".join(raw_authors) if isinstance(raw_authors, list) else str(raw_authors)
+    paper_link = data.get("link") or "#"
+    paper_link = paper_link if isinstance(paper_link, str) else str(paper_link)
+
+    pub_date = str(data.get("published", ""))
+    year_match = re.search(r"\b(?:19|20)\d{2}\b", pub_date)
+    year_str = year_match.group(0) if year_match else "N/A"
+
+    topics = []
+    subject_area = data.get("subject_area") or {}
+    raw_areas = subject_area.get("areas", []) if isinstance(subject_area, dict) else []
+    for area in raw_areas:
+        if isinstance(area, dict):
+            topics.append(area.get("name", "Unknown"))
+        else:
+            topics.append(str(area))
+
+    return {
+        "title": data.get("paper_title") or "Untitled Paper",
+        "authors": authors_str,
+        "year": year_str,
+        "venue": "arXiv" if "arxiv" in paper_link.lower() else "Scientific Publication",
+        "url": paper_link,
+        "topics": topics,
+        "filename": file_path.name,
+        "path": str(file_path),
+        "content_hash": hashlib.sha256(raw).hexdigest(),
+    }
+
+
+# Parsed JSON of recently opened papers (summaries, surveys), most recent last.
+FULL_DATA_CACHE_SIZE = 32
+_full_data_cache = OrderedDict()
+_full_data_lock = threading.Lock()
+
+
+def load_full_data(paper, cache=True):
+    """
+    The parsed JSON behind a paper record, read from disk on demand and kept
+    in a bounded LRU. Pass cache=False for one-off bulk reads (indexing,
+    prerendering) so they do not evict what users have open. The result is
+    shared; do not mutate it.
+    """
+    if "full_data" in paper:
+        return paper["full_data"]
+    key = paper.get("content_hash") or paper["path"]
+    with _full_data_lock:
+        data = _full_data_cache.get(key)
+        if data is not None:
+            _full_data_cache.move_to_end(key)
+            return data
+    data = json.loads(Path(paper["path"]).read_bytes().decode("utf-8"))
+    if cache:
+        with _full_data_lock:
+            _full_data_cache[key] = data
+            while len(_full_data_cache) > FULL_DATA_CACHE_SIZE:
+                _full_data_cache.popitem(last=False)
+    return data
+
+
+# ---------------------------------------------------------
+# CORPUS CACHE
+# ---------------------------------------------------------
+# One ingest manifest per corpus directory: path, size, mtime, content hash
+# and parse status of every file.
+MANIFEST_DIR = BASE_DIR / ".cache" / "manifests"
+
+
+class PaperCorpus:
+    """
+    Paper records for one directory, shared by every session of the process.
+    refresh() only stats the files; a file is reparsed (with `parser`) when its
+    mtime or size changes, and removed files are dropped. The result of each
+    file is kept in a manifest, so files that fail to parse are reported
+    rather than silently skipped. Subfolders are scanned too, so each
+    record's "filename" is its path relative to the directory.
+    """
+
+    def __init__(self, directory_name="Papers", min_refresh_interval=2.0, parser=parse_paper, manifest_path=None):
+        self.directory_name = directory_name
+        self.min_refresh_interval = min_refresh_interval
+        self.parser = parser
+        self.manifest_path = manifest_path or MANIFEST_DIR / f"{re.sub(r'[^A-Za-z0-9_-]+', '_', directory_name)}.json"
+        self.version = 0
+        self.manifest = {}
+        self.last_changes = {"added": [], "changed": [], "removed": []}
+        self._entries = {}
+        self._papers = []
+        self._last_refresh = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watch_error = None
+
+    @property
+    def papers(self):
+        return self._papers
+
+    def errors(self):
+        """
+        Manifest entries of files that could not be parsed, plus an entry for
+        the directory when the last background refresh failed.
+        """
+        errors = [entry for entry in self.manifest.values() if entry["status"] == "error"]
+        if self._watch_error is not None:
+            errors.append(self._watch_error)
+        return errors
+
+    def refresh(self, force=False):
+        """Bring the corpus up to date with the directory and return the paper list."""
+        now = time.monotonic()
+        if (
+            not force
+            and self._last_refresh is not None
+            and now - self._last_refresh < self.min_refresh_interval
+        ):
+            return self._papers
+
+        with self._lock, span("corpus.refresh") as timing:
+            self._last_refresh = now
+            directory = resolve_papers_directory(self.directory_name)
+            json_files = sorted(directory.rglob("*.json")) if directory.exists() else []
+
+            entries = {}
+            changes = {"added": [], "changed": [], "removed": []}
+            for file_path in json_files:
+                key = str(file_path)
+                try:
+                    signature = file_signature(file_path)
+                except OSError:
+                    continue
+                cached = self._entries.get(key)
+                if cached and cached[0] == signature:
+                    entries[key] = cached
+                    continue
+                changes["changed" if cached else "added"].append(key)
+                entries[key] = (signature, *self._ingest(file_path, signature, directory))
+            changes["removed"] = [key for key in self._entries if key not in entries]
+            timing["files"] = len(json_files)
+            timing["changed"] = sum(len(keys) for keys in changes.values())
+
+            if any(changes.values()):
+                self._entries = entries
+                # Replace rather than mutate, so readers holding the old list are unaffected.
+                self._papers = [record for _, record, _ in entries.values() if record is not None]
+                self.manifest = {key: entry for key, (_, _, entry) in entries.items()}
+                self.last_changes = changes
+                self.version += 1
+                self._write_manifest()
+            return self._papers
+
+    def _ingest(self, file_path, signature, directory):
+        """Parse one file; returns (record or None, manifest entry)."""
+        entry = {
+            "path": str(file_path),
+            "size": signature[1],
+            "mtime": signature[0] / 1e9,
+            "content_hash": None,
+            "status": "ok",
+            "error": None,
+        }
+        record = None
+        try:
+            record = self.parser(file_path)
+            # Same-named files in different subfolders must not share a key.
+            record["filename"] = file_path.relative_to(directory).as_posix()
+            entry["content_hash"] = record.get("content_hash")
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = f"{type(e).__name__}: {e}"
+            try:
+                entry["content_hash"] = hashlib.sha256(file_path.read_bytes()).hexdigest()
+            except OSError:
+                pass
+        return record, entry
+
+    def _write_manifest(self):
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(list(self.manifest.values()), indent=2), encoding="utf-8")
+            tmp.replace(self.manifest_path)
+        except OSError:
+            # The manifest is a report; a read-only deployment still serves papers.
+            pass
+
+    def export_state(self):
+        """Picklable state for a snapshot (see snapshot.py)."""
+        with self._lock:
+            return {
+                "directory": str(resolve_papers_directory(self.directory_name)),
+                "entries": dict(self._entries),
+            }
+
+    def restore_state(self, state):
+        """
+        Seed the corpus from export_state(). The next refresh() still diffs the
+        directory, so only files changed since the snapshot are reparsed.
+        Returns False when the snapshot was taken from another directory.
+        """
+        if state.get("directory") != str(resolve_papers_directory(self.directory_name)):
+            return False
+        with self._lock:
+            self._entries = dict(state["entries"])
+            self._papers = [record for _, record, _ in self._entries.values() if record is not None]
+            self.manifest = {key: entry for key, (_, _, entry) in self._entries.items()}
+            self.last_changes = {"added": list(self._entries), "changed": [], "removed": []}
+            self.version += 1
+            self._last_refresh = None
+        return True
+
+    def watch(self, interval=10.0):
+        """
+        Re-diff the directory every `interval` seconds on a daemon thread, so
+        new files are parsed before the next rerun asks for them. Idempotent.
+        """
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh(force=True)
+                self._watch_error = None
+            except Exception as e:
+                error = f"Refresh failed: {type(e).__name__}: {e}"
+                if self._watch_error is None or self._watch_error["error"] != error:
+                    # Logged once per distinct failure, not on every retry.
+                    logger.exception("Refreshing %s failed", self.directory_name)
+                self._watch_error = {
+                    "path": str(resolve_papers_directory(self.directory_name)),
+                    "status": "error",
+                    "error": error,
+                }
+
+    def summary(self):
+        """Counts for the last refresh, e.g. for an ingest report."""
+        return {
+            "files": len(self.manifest),
+            "loaded": len(self._papers),
+            "errors": len(self.errors()),
+            **{name: len(keys) for name, keys in self.last_changes.items()},
+        }
+
+
+def load_papers_from_directory(directory_name="Papers"):
+    return PaperCorpus(directory_name).refresh(force=True)
+
+
+if __name__ == "__main__":
+    # Ingest report: python corpus.py [directory]
+    import sys
+
+    corpus = PaperCorpus(sys.argv[1] if len(sys.argv) > 1 else "Papers")
+    corpus.refresh(force=True)
+    summary = corpus.summary()
+    print(f"{summary['loaded']} of {summary['files']} files loaded; manifest written to {corpus.manifest_path}")
+    for entry in corpus.errors():
+        print(f"  ERROR {entry['path']}: {entry['error']}")
+    sys.exit(1 if summary["errors"] else 0)
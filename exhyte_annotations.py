@@ -0,0 +1,161 @@
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+from corpus import PaperCorpus
+
+ANNOTATIONS_DIRECTORY = "exhyte_data"
+
+# Keys of an annotation file that describe the paper rather than a stage.
+METADATA_KEYS = ("paper_title", "authors", "published", "link")
+
+
+# ---------------------------------------------------------
+# PARSING
+# ---------------------------------------------------------
+def is_performed(node):
+    return isinstance(node, dict) and str(node.get("performed", "")).strip().lower() == "yes"
+
+
+def parse_annotation(file_path):
+    """
+    Read one EXHYTE annotation file into {stage: performed} and
+    {(stage, substage): performed}. Substages of a stage marked "No" are
+    usually omitted and count as not performed.
+    """
+    raw = file_path.read_bytes()
+    data = json.loads(raw.decode("utf-8"))
+
+    stages = {}
+    substages = {}
+    for stage, node in data.items():
+        if stage in METADATA_KEYS or not isinstance(node, dict):
+            continue
+        stages[stage] = is_performed(node)
+        for substage, sub_node in node.items():
+            if isinstance(sub_node, dict):
+                substages[(stage, substage)] = is_performed(sub_node)
+
+    year_match = re.search(r"\b(?:19|20)\d{2}\b", str(data.get("published", "")))
+    link = data.get("link") or ""
+    return {
+        "filename": file_path.name,
+        "title": data.get("paper_title") or "Untitled Paper",
+        "link": link if isinstance(link, str) else str(link),
+        "year": year_match.group(0) if year_match else "N/A",
+        "content_hash": hashlib.sha256(raw).hexdigest(),
+        "stages": stages,
+        "substages": substages,
+    }
+
+
+def normalize_title(title):
+    return re.sub(r"[^a-z0-9]+", " ", str(title).lower()).strip()
+
+
+# ---------------------------------------------------------
+# MATRIX
+# ---------------------------------------------------------
+class AnnotationMatrix:
+    """
+    Paper × substage boolean matrix of the EXHYTE annotations.
+
+    `substages` is a bool DataFrame indexed by annotation filename with
+    (stage, substage) MultiIndex columns; `stages` holds the stage-level flags.
+    `papers` maps each row to its annotation metadata and to the filename of
+    the matching summary in Papers/ (joined on filename, then title, then link).
+    """
+
+    def __init__(self, annotations, papers=()):
+        annotations = list(annotations)
+        stage_names = []
+        substage_names = []
+        for record in annotations:
+            for stage in record["stages"]:
+                if stage not in stage_names:
+                    stage_names.append(stage)
+            for key in record["substages"]:
+                if key not in substage_names:
+                    substage_names.append(key)
+        # Keep the annotation schema order: stages first seen, substages grouped by stage.
+        substage_names.sort(key=lambda key: stage_names.index(key[0]))
+
+        index = pd.Index([record["filename"] for record in annotations], name="filename")
+        stage_values = np.zeros((len(annotations), len(stage_names)), dtype=bool)
+        substage_values = np.zeros((len(annotations), len(substage_names)), dtype=bool)
+        substage_positions = {key: i for i, key in enumerate(substage_names)}
+        for row, record in enumerate(annotations):
+            for col, stage in enumerate(stage_names):
+                stage_values[row, col] = record["stages"].get(stage, False)
+            for key, performed in record["substages"].items():
+                substage_values[row, substage_positions[key]] = performed
+
+        self.stages = pd.DataFrame(stage_values, index=index, columns=pd.Index(stage_names, name="stage"))
+        self.substages = pd.DataFrame(
+            substage_values,
+            index=index,
+            columns=pd.MultiIndex.from_tuples(substage_names, names=["stage", "substage"]),
+        )
+        self.papers = pd.DataFrame(
+            {
+                "title": [record["title"] for record in annotations],
+                "year": [record["year"] for record in annotations],
+                "link": [record["link"] for record in annotations],
+                "paper_filename": join_to_papers(annotations, papers),
+            },
+            index=index,
+        )
+
+    def __len__(self):
+        return len(self.substages)
+
+    def substage_options(self):
+        return list(self.substages.columns)
+
+    def filter(self, all_of=(), any_of=(), none_of=()):
+        """
+        Boolean row mask: papers performing every substage in `all_of`, at
+        least one in `any_of` (if given) and none in `none_of`. Each item is a
+        (stage, substage) tuple, or a stage name for the stage-level flag.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key in all_of:
+            mask &= self._column(key)
+        if any_of:
+            any_mask = np.zeros(len(self), dtype=bool)
+            for key in any_of:
+                any_mask |= self._column(key)
+            mask &= any_mask
+        for key in none_of:
+            mask &= ~self._column(key)
+        return pd.Series(mask, index=self.substages.index)
+
+    def _column(self, key):
+        if isinstance(key, tuple):
+            return self.substages[key].to_numpy()
+        return self.stages[key].to_numpy()
+
+    def paper_filenames(self, mask):
+        """Papers/ filenames for the annotated papers selected by `mask`."""
+        return set(self.papers.loc[mask.to_numpy(), "paper_filename"].dropna())
+
+
+def join_to_papers(annotations, papers):
+    by_filename = {p["filename"]: p["filename"] for p in papers}
+    by_title = {normalize_title(p["title"]): p["filename"] for p in papers}
+    by_link = {p["url"]: p["filename"] for p in papers if p.get("url", "#") != "#"}
+    joined = []
+    for record in annotations:
+        joined.append(
+            by_filename.get(record["filename"])
+            or by_title.get(normalize_title(record["title"]))
+            or by_link.get(record["link"])
+        )
+    return joined
+
+
+def annotation_corpus():
+    return PaperCorpus(ANNOTATIONS_DIRECTORY, parser=parse_annotation)
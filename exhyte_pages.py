@@ -0,0 +1,341 @@
+import base64
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from image_variants import VARIANTS_VERSION, image_variants
+from profiling import span
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Processed pages are written here, named by the hash of their inputs.
+CACHE_DIR = BASE_DIR / ".cache" / "pages"
+# Streamlit serves BASE_DIR/static at app/static/ when server.enableStaticServing is on.
+STATIC_DIR = BASE_DIR / "static" / "exhyte"
+STATIC_URL = "app/static/exhyte"
+
+# Bump when process_html_content changes so stale cached pages are not reused.
+PROCESSOR_VERSION = "2"
+
+# The pages fill their iframe, which is about as wide as the viewport.
+IMAGE_SIZES = "100vw"
+
+# Without static serving each figure is inlined once, as this WebP variant.
+INLINE_WIDTH = 1440
+INLINE_FORMAT = "WEBP"
+
+FILES = {
+    "tab1_html": "EXHYTE_webpage (1).html",
+    "tab2_html": "EXHYTE_webpage (1)-1 (1).html",
+    "tab3_html": "EXHYTE_webpage (2) (1).html",
+}
+
+IMAGE_FILES = [
+    "image001.png",
+    "image001_t2.jpg",
+    "image002.jpg",
+    "image003.jpg",
+    "figure1.v10.png",
+    "figure_2_v4_062126.png",
+    "EXHYTE_stages_input_outputs_v4.png",
+    "figure4_ai_methods.png",
+]
+
+# Names used in the HTML that refer to one of IMAGE_FILES.
+IMAGE_ALIASES = {
+    "Image_001.png": "image001.png",
+}
+
+
+# ---------------------------------------------------------
+# HTML PROCESSING
+# ---------------------------------------------------------
+def process_html_content(html_content, image_map):
+    """
+    Clean an exported EXHYTE page for embedding. `image_map` maps image file
+    names to the src to use for them (a URL or a data URI) or to a responsive
+    image from responsive_image(), which becomes a lazily loaded <picture>.
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for link in soup.find_all("a", href=True):
+        if "wordtohtml.net" in link["href"]:
+            removable = link.find_parent("div") or link
+            removable.decompose()
+
+    for p in soup.find_all('p'):
+        if not p.get_text(strip=True) and p.find('br'):
+            p.decompose()
+
+    images = soup.find_all('img')
+    for img in images:
+        src = img.get('src', '')
+        is_data_uri = src.startswith("data:")
+        filename = src.split('/')[-1].split("?")[0] if '/' in src else src.split("?")[0]
+        if filename in image_map and isinstance(image_map[filename], dict):
+            set_picture(soup, img, image_map[filename])
+        elif filename in image_map:
+            img['src'] = image_map[filename]
+        elif not is_data_uri:
+            placeholder = soup.new_tag("div")
+            placeholder["style"] = (
+                "border: 1px dashed #aaa; background: #f8f8f8; color: #555; "
+                "font-family: 'Times New Roman', serif; text-align: center; "
+                "padding: 32px 16px; margin: 16px auto; max-width: 640px;"
+            )
+            placeholder.string = f"Missing image file: {filename or 'unknown image'}"
+            img.replace_with(placeholder)
+            continue
+        existing_style = img.get('style', '')
+        img['style'] = "; ".join([
+            part for part in [existing_style, 'max-width: 100%; height: auto; display: block; margin: 0 auto;'] if part
+        ])
+    if soup.body and "exhyte-paper" in soup.body.get("class", []):
+        return str(soup)
+    style_tag = soup.new_tag("style")
+    style_tag.string = """
+        html, body {
+            background: #ffffff;
+            color: #111;
+        }
+        body, body.pdf-article, body.exhyte-paper {
+            box-sizing: border-box;
+            margin: 0 auto !important;
+            max-width: none !important;
+            width: 100% !important;
+            padding: 20px 24px 34px !important;
+            background: #ffffff;
+            color: #111;
+            font-family: "Times New Roman", serif;
+            font-size: 14pt !important;
+            line-height: 1.45 !important;
+        }
+        p, h1, h2, h3, h4, h5, li, div {
+            margin-top: 5px !important; margin-bottom: 5px !important;
+            padding-top: 0px !important; padding-bottom: 0px !important;
+            line-height: 1.45 !important;
+        }
+        h1 { font-size: 22pt !important; line-height: 1.22 !important; }
+        h2 { font-size: 18pt !important; line-height: 1.25 !important; }
+        h3 { font-size: 16pt !important; line-height: 1.28 !important; }
+        li { margin-left: 20px !important; }
+        figure { margin: 16px 0; }
+        img { max-width: 100%; height: auto; display: block; margin: 0 auto; }
+        figcaption { font-size: 14pt !important; line-height: 1.35 !important; text-align: justify; }
+        a { color: #0b57d0; text-decoration: underline; }
+    """
+    if soup.head: soup.head.append(style_tag)
+    else: soup.append(style_tag)
+    return str(soup)
+
+
+def set_picture(soup, img, image):
+    """Wrap `img` in a <picture> offering `image`'s AVIF/WebP/PNG variants."""
+    picture = soup.new_tag("picture")
+    for source in image["sources"]:
+        picture.append(soup.new_tag("source", attrs={"type": source["type"], "srcset": source["srcset"], "sizes": IMAGE_SIZES}))
+    img["src"] = image["src"]
+    img["srcset"] = image["srcset"]
+    img["sizes"] = IMAGE_SIZES
+    if not img.get("width") and not img.get("height"):
+        # Reserves the figure's space before it loads; CSS still scales it.
+        img["width"] = str(image["width"])
+        img["height"] = str(image["height"])
+    img["loading"] = "lazy"
+    img["decoding"] = "async"
+    img.wrap(picture)
+
+
+# ---------------------------------------------------------
+# CONTENT HASHES
+# ---------------------------------------------------------
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def content_hash(file_path):
+    """sha256 of a file, recomputed only when its mtime or size changes."""
+    stat = file_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = str(file_path)
+    with _hash_lock:
+        cached = _hash_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+    with _hash_lock:
+        _hash_cache[key] = (signature, digest)
+    return digest
+
+
+def available_images():
+    """{filename: path} for every IMAGE_FILES entry (and alias) present on disk."""
+    images = {}
+    for img_name in IMAGE_FILES:
+        path = BASE_DIR / img_name
+        if path.is_file():
+            images[img_name] = path
+    for alias, img_name in IMAGE_ALIASES.items():
+        if img_name in images:
+            images[alias] = images[img_name]
+    return images
+
+
+# ---------------------------------------------------------
+# IMAGE SOURCES
+# ---------------------------------------------------------
+def image_data_uri(path):
+    ext = path.suffix.lstrip(".").lower()
+    mime = "jpeg" if ext == "jpg" else ext
+    return f"data:image/{mime};base64,{base64.b64encode(path.read_bytes()).decode()}"
+
+
+def publish_file(path, target_dir, name=None):
+    """Copy `path` into `target_dir` (as `name`) unless a file of that name is already there."""
+    target = target_dir / (name or path.name)
+    if not target.exists():
+        target_dir.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        shutil.copyfile(path, tmp)
+        tmp.replace(target)
+    return target
+
+
+def responsive_image(path, target_dir=STATIC_DIR, url_prefix=STATIC_URL, wait=True):
+    """
+    Copy the variants of an image (see image_variants.py) into `target_dir`,
+    whose files are served at `url_prefix`, and return them for
+    process_html_content: {"src", "srcset", "sources": [{"type", "srcset"}],
+    "width", "height"}. Variant names carry the source hash, so browsers can
+    cache them indefinitely. With wait=False, returns None while the
+    variants are encoded in the background.
+    """
+    result = image_variants(path, content_hash(path), wait)
+    if result is None:
+        return None
+    srcsets = {}
+    for variant in result["variants"]:
+        url = f"{url_prefix}/{publish_file(variant['path'], target_dir).name}"
+        srcsets.setdefault(variant["mime"], []).append((variant["width"], url))
+    fallback = srcsets.pop("image/png")
+    return {
+        "src": fallback[-1][1],
+        "srcset": ", ".join(f"{url} {width}w" for width, url in fallback),
+        "sources": [
+            {"type": mime, "srcset": ", ".join(f"{url} {width}w" for width, url in entries)}
+            for mime, entries in srcsets.items()
+        ],
+        "width": result["width"],
+        "height": result["height"],
+    }
+
+
+def inline_image(path, wait=True):
+    """
+    A data URI of the image's INLINE_FORMAT variant closest to INLINE_WIDTH.
+    With wait=False, returns None while the variants are encoded in the
+    background.
+    """
+    result = image_variants(path, content_hash(path), wait)
+    if result is None:
+        return None
+    variants = [v for v in result["variants"] if v["format"] == INLINE_FORMAT]
+    variant = min(variants, key=lambda v: abs(v["width"] - INLINE_WIDTH))
+    return image_data_uri(variant["path"])
+
+
+def original_image(path, mode):
+    """The unprocessed image: a URL under STATIC_DIR (named by its hash) or a data URI."""
+    if mode == "inline":
+        return image_data_uri(path)
+    name = f"{path.stem}.{content_hash(path)[:16]}{path.suffix}"
+    return f"{STATIC_URL}/{publish_file(path, STATIC_DIR, name).name}"
+
+
+def build_image_map(mode="static", wait=True):
+    """
+    ({filename: image}, [pending filenames]) for the available images. mode
+    is "static" (responsive variants served by URL) or "inline" (one data URI
+    per image, for deployments without static serving). With wait=False,
+    images whose variants are still being encoded in the background map to
+    the original file and are listed as pending.
+    """
+    image_map = {}
+    pending = []
+    with span("pages.build_image_map", mode=mode) as timing:
+        for name, path in available_images().items():
+            image = responsive_image(path, wait=wait) if mode == "static" else inline_image(path, wait)
+            if image is None:
+                image = original_image(path, mode)
+                pending.append(name)
+            image_map[name] = image
+        timing["images"] = len(image_map)
+        timing["pending"] = len(pending)
+        timing["inline_bytes"] = sum(len(src) for src in image_map.values() if isinstance(src, str))
+    return image_map, pending
+
+
+# ---------------------------------------------------------
+# PAGE BUILD CACHE
+# ---------------------------------------------------------
+# In-process copies of built pages, keyed like the files in CACHE_DIR.
+_page_memo = {}
+
+
+def page_cache_key(html_path, mode):
+    parts = [PROCESSOR_VERSION, VARIANTS_VERSION, mode, content_hash(html_path)]
+    for name, path in sorted(available_images().items()):
+        parts.append(f"{name}={content_hash(path)}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def render_page(html_path, image_map):
+    html_content = html_path.read_text(encoding="utf-8")
+    with span("pages.process_html_content", page=html_path.name, input_bytes=len(html_content)) as timing:
+        processed = process_html_content(html_content, image_map)
+        timing["output_bytes"] = len(processed)
+    return processed
+
+
+def build_page(html_name, mode="static", wait=True):
+    """
+    Return the processed HTML for one of FILES, reusing the copy in CACHE_DIR
+    when neither the page nor any image has changed. Returns None when the
+    source file is missing. With wait=False, a page whose image variants are
+    not encoded yet is built with the original images and not cached, so a
+    later call picks up the variants.
+    """
+    html_path = BASE_DIR / html_name
+    if not html_path.is_file():
+        return None
+    cache_key = page_cache_key(html_path, mode)
+    if cache_key in _page_memo:
+        return _page_memo[cache_key]
+
+    cache_path = CACHE_DIR / f"{cache_key}.html"
+    if mode == "inline" and cache_path.exists():
+        processed = cache_path.read_text(encoding="utf-8")
+    else:
+        # Static pages link the published variants, so those are checked (and
+        # encoded or published, e.g. after a fresh checkout) before a cached
+        # page is served.
+        image_map, pending = build_image_map(mode, wait)
+        if pending:
+            return render_page(html_path, image_map)
+        if cache_path.exists():
+            processed = cache_path.read_text(encoding="utf-8")
+        else:
+            processed = render_page(html_path, image_map)
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(processed, encoding="utf-8")
+            tmp.replace(cache_path)
+    _page_memo[cache_key] = processed
+    return processed
+
+
+def build_all_pages(mode="static"):
+    return {key: build_page(name, mode) for key, name in FILES.items()}
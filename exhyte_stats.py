@@ -0,0 +1,166 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# WORKFLOW STEPS
+# ---------------------------------------------------------
+# EXHYTE stages in workflow order. "Test" is split by substage into design,
+# execution and refinement so generation → testing → refinement is visible.
+WORKFLOW_STEPS = [
+    ("Inputs", "Inputs to the workflow", None),
+    ("Query Structuring", "Query Structuring", None),
+    ("Data Retrieval", "Data Retrieval", None),
+    ("Knowledge Assembly", "Knowledge Assembly", None),
+    ("Idea Generation", "Hypothesis/Idea Generation", None),
+    ("Idea Prioritization", "Hypothesis/Idea Prioritization", None),
+    ("Test Design", "Test", ("Experimental Design", "LLM-Based Experimental Design")),
+    ("Test Execution", "Test", ("Test Execution",)),
+    ("Refinement", "Test", ("Refinement",)),
+]
+STEP_NAMES = [name for name, _, _ in WORKFLOW_STEPS]
+
+
+def step_flags(record):
+    """Which WORKFLOW_STEPS an annotation record performs, as a bool vector."""
+    flags = np.zeros(len(WORKFLOW_STEPS), dtype=bool)
+    for i, (_, stage, prefixes) in enumerate(WORKFLOW_STEPS):
+        if prefixes is None:
+            flags[i] = record["stages"].get(stage, False)
+        else:
+            flags[i] = any(
+                performed
+                for (sub_stage, substage), performed in record["substages"].items()
+                if sub_stage == stage and substage.startswith(prefixes)
+            )
+    return flags
+
+
+def transition_flags(steps):
+    """
+    Bool vector over (from, to) step pairs: True when both steps are performed
+    and no step between them is, i.e. `to` directly follows `from`.
+    """
+    n = len(steps)
+    performed = np.flatnonzero(steps)
+    flags = np.zeros((n, n), dtype=bool)
+    flags[performed[:-1], performed[1:]] = True
+    return flags
+
+
+# ---------------------------------------------------------
+# AGGREGATES
+# ---------------------------------------------------------
+class WorkflowStats:
+    """
+    Substage co-occurrence, step transition and per-year counts over the
+    annotation records. sync() applies only the records that were added,
+    changed or removed: their old contribution is subtracted and the new one
+    added, so a single changed file does not trigger a full recount.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+        self._substage_keys = []
+        self._substage_index = {}
+        n_steps = len(WORKFLOW_STEPS)
+        self.n_papers = 0
+        self._substage_counts = np.zeros(0, dtype=np.int64)
+        self._cooccurrence = np.zeros((0, 0), dtype=np.int64)
+        self._step_counts = np.zeros(n_steps, dtype=np.int64)
+        self._step_cooccurrence = np.zeros((n_steps, n_steps), dtype=np.int64)
+        self._transitions = np.zeros((n_steps, n_steps), dtype=np.int64)
+        self._year_papers = {}
+        self._year_steps = {}
+
+    def sync(self, annotations):
+        with self._lock:
+            current = {record["filename"]: record for record in annotations}
+            for filename in [f for f in self._records if f not in current]:
+                self._apply(self._records.pop(filename), -1)
+            for filename, record in current.items():
+                old = self._records.get(filename)
+                if old is not None and old["content_hash"] == record["content_hash"]:
+                    continue
+                if old is not None:
+                    self._apply(old, -1)
+                self._apply(record, 1)
+                self._records[filename] = record
+
+    def _substage_vector(self, record):
+        for key in record["substages"]:
+            if key not in self._substage_index:
+                self._substage_index[key] = len(self._substage_keys)
+                self._substage_keys.append(key)
+        size = len(self._substage_keys)
+        if size > len(self._substage_counts):
+            grow = size - len(self._substage_counts)
+            self._substage_counts = np.pad(self._substage_counts, (0, grow))
+            self._cooccurrence = np.pad(self._cooccurrence, ((0, grow), (0, grow)))
+        vector = np.zeros(size, dtype=np.int64)
+        for key, performed in record["substages"].items():
+            if performed:
+                vector[self._substage_index[key]] = 1
+        return vector
+
+    def _apply(self, record, sign):
+        substages = self._substage_vector(record)
+        steps = step_flags(record).astype(np.int64)
+        self.n_papers += sign
+        self._substage_counts += sign * substages
+        self._cooccurrence += sign * np.outer(substages, substages)
+        self._step_counts += sign * steps
+        self._step_cooccurrence += sign * np.outer(steps, steps)
+        self._transitions += sign * transition_flags(steps.astype(bool))
+        year = record.get("year", "N/A")
+        self._year_papers[year] = self._year_papers.get(year, 0) + sign
+        self._year_steps[year] = self._year_steps.get(year, np.zeros(len(steps), dtype=np.int64)) + sign * steps
+        if self._year_papers[year] == 0:
+            del self._year_papers[year]
+            del self._year_steps[year]
+
+    # --- Read API: each returns a fresh DataFrame built from the aggregates ---
+    def step_counts(self):
+        with self._lock:
+            counts = self._step_counts.copy()
+        return pd.DataFrame(
+            {"papers": counts, "share": counts / max(self.n_papers, 1)},
+            index=pd.Index(STEP_NAMES, name="step"),
+        )
+
+    def step_cooccurrence(self):
+        with self._lock:
+            values = self._step_cooccurrence.copy()
+        return pd.DataFrame(values, index=STEP_NAMES, columns=STEP_NAMES)
+
+    def substage_cooccurrence(self, min_count=1):
+        """Substage × substage paper counts, limited to substages seen at least `min_count` times."""
+        with self._lock:
+            keys = list(self._substage_keys)
+            counts = self._substage_counts.copy()
+            values = self._cooccurrence.copy()
+        keep = np.flatnonzero(counts >= min_count)
+        index = pd.MultiIndex.from_tuples([keys[i] for i in keep], names=["stage", "substage"])
+        return pd.DataFrame(values[np.ix_(keep, keep)], index=index, columns=index)
+
+    def transitions(self):
+        """Long-form (from, to, papers) counts of direct step-to-step transitions."""
+        with self._lock:
+            values = self._transitions.copy()
+        rows = [
+            (STEP_NAMES[i], STEP_NAMES[j], int(values[i, j]))
+            for i, j in zip(*np.nonzero(values))
+        ]
+        return pd.DataFrame(rows, columns=["from", "to", "papers"]).sort_values("papers", ascending=False, ignore_index=True)
+
+    def yearly_trends(self):
+        """Share of each year's annotated papers performing each step."""
+        with self._lock:
+            years = sorted(y for y in self._year_papers if y != "N/A")
+            shares = [self._year_steps[y] / self._year_papers[y] for y in years]
+            papers = [self._year_papers[y] for y in years]
+        trends = pd.DataFrame(shares, index=pd.Index(years, name="year"), columns=STEP_NAMES)
+        trends.insert(0, "papers", papers)
+        return trends
@@ -0,0 +1,139 @@
+import re
+
+import numpy as np
+
+# ---------------------------------------------------------
+# FACETS
+# ---------------------------------------------------------
+# How the selected values of one facet combine: "any" keeps papers with at
+# least one of them, "all" papers with every one. Facets are always ANDed.
+FACET_MODES = {
+    "topic": "any",
+    "year": "any",
+    "venue": "any",
+    "substage": "all",
+}
+
+YEAR_PATTERN = re.compile(r"(?:19|20)\d{2}")
+
+
+def paper_facet_values(paper):
+    """{facet: [values]} for one paper record (substages come from the annotations)."""
+    year = str(paper.get("year", ""))
+    return {
+        "topic": list(dict.fromkeys(paper.get("topics", []))),
+        "year": [year] if YEAR_PATTERN.fullmatch(year) else [],
+        "venue": [paper["venue"]] if paper.get("venue") else [],
+    }
+
+
+def gather_rows(indptr, ids, rows):
+    """Concatenated CSR entries of `rows`; cost is proportional to their size."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    if not lengths.sum():
+        return ids[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return ids[offsets]
+
+
+class FacetIndex:
+    """
+    Bitmap index over the paper list: one boolean row mask per facet value
+    (topic, year, venue and EXHYTE substage), plus the per-paper value ids
+    used for counting. A filter is an AND/OR of a few masks; live counts only
+    touch the papers that survive the other facets' selections.
+    """
+
+    def __init__(self, papers, annotation_matrix=None):
+        self.papers = list(papers)
+        self._rows = {paper.get("filename"): i for i, paper in enumerate(self.papers)}
+        per_paper = {facet: [] for facet in FACET_MODES}
+        for paper in self.papers:
+            for facet, values in paper_facet_values(paper).items():
+                per_paper[facet].append(values)
+        per_paper["substage"] = self._annotation_values(annotation_matrix)
+
+        self.values = {}
+        self._value_ids = {}
+        self._bitmaps = {}
+        self._doc_values = {}
+        for facet, rows in per_paper.items():
+            values = sorted({value for row in rows for value in row})
+            if facet == "year":
+                values.reverse()
+            value_ids = {value: i for i, value in enumerate(values)}
+            lengths = np.array([len(row) for row in rows], dtype=np.int64)
+            indptr = np.concatenate(([0], np.cumsum(lengths)))
+            ids = np.array([value_ids[value] for row in rows for value in row], dtype=np.int64)
+            bitmaps = np.zeros((len(values), len(self.papers)), dtype=bool)
+            bitmaps[ids, np.repeat(np.arange(len(self.papers)), lengths)] = True
+            self.values[facet] = values
+            self._value_ids[facet] = value_ids
+            self._bitmaps[facet] = bitmaps
+            self._doc_values[facet] = (indptr, ids)
+
+    def _annotation_values(self, matrix):
+        rows = [[] for _ in self.papers]
+        if matrix is None:
+            return rows
+        filenames = matrix.papers["paper_filename"].to_numpy()
+        for key in matrix.substage_options():
+            for filename in filenames[matrix.substages[key].to_numpy()]:
+                row = self._rows.get(filename)
+                if row is not None and key not in rows[row]:
+                    rows[row].append(key)
+        return rows
+
+    def __len__(self):
+        return len(self.papers)
+
+    def options(self, facet):
+        return self.values[facet]
+
+    def paper_values(self, facet):
+        """Per paper, in corpus order, the ids (positions in options(facet)) of its values."""
+        indptr, ids = self._doc_values[facet]
+        return [ids[indptr[i]:indptr[i + 1]].tolist() for i in range(len(self.papers))]
+
+    def facet_mask(self, facet, selected):
+        """Row mask for one facet's selection; None when nothing is selected."""
+        if not selected:
+            return None
+        value_ids = self._value_ids[facet]
+        ids = [value_ids[value] for value in selected if value in value_ids]
+        # No paper has an unknown value, so in "all" mode a selection that
+        # includes one matches nothing.
+        if not ids or (FACET_MODES[facet] == "all" and len(ids) < len(selected)):
+            return np.zeros(len(self.papers), dtype=bool)
+        bitmaps = self._bitmaps[facet][ids]
+        return bitmaps.all(axis=0) if FACET_MODES[facet] == "all" else bitmaps.any(axis=0)
+
+    def mask(self, selections, base=None, exclude=None):
+        """AND of every facet's mask (except `exclude`), starting from `base`."""
+        mask = np.ones(len(self.papers), dtype=bool) if base is None else base.copy()
+        for facet, selected in selections.items():
+            if facet == exclude:
+                continue
+            facet_mask = self.facet_mask(facet, selected)
+            if facet_mask is not None:
+                mask &= facet_mask
+        return mask
+
+    def select(self, selections, base=None):
+        """Papers matching `selections` ({facet: [values]}), in corpus order."""
+        return [self.papers[i] for i in np.flatnonzero(self.mask(selections, base))]
+
+    def contains(self, mask, paper):
+        row = self._rows.get(paper.get("filename"))
+        return row is not None and bool(mask[row])
+
+    def counts(self, facet, selections, base=None):
+        """
+        {value: papers} for one facet, counted over the papers matching every
+        other facet's selection, so the numbers show what picking a value adds.
+        """
+        rows = np.flatnonzero(self.mask(selections, base, exclude=facet))
+        indptr, ids = self._doc_values[facet]
+        counts = np.bincount(gather_rows(indptr, ids, rows), minlength=len(self.values[facet]))
+        return dict(zip(self.values[facet], counts.tolist()))
@@ -0,0 +1,178 @@
+"""
+Resized, recompressed copies of the EXHYTE figures for responsive <picture>
+markup: AVIF and WebP at several widths plus a palette PNG fallback.
+
+Variants are cached in CACHE_DIR under the source's content hash, so each
+one is encoded once per image version. The first build takes several
+seconds per figure, so the app encodes missing variants in the background
+and shows the original images meanwhile; `python snapshot.py` builds them
+ahead of time, as does
+
+    python image_variants.py
+"""
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, features
+
+from profiling import span
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Bump when WIDTHS, FORMATS or the encoding changes so old variants are not reused.
+VARIANTS_VERSION = "1"
+CACHE_DIR = BASE_DIR / ".cache" / "images" / VARIANTS_VERSION
+
+# Variant widths in pixels. Images are never upscaled: widths at or above the
+# source's are replaced by the source width, capped at the last entry.
+WIDTHS = (480, 960, 1440, 1920)
+
+# (Pillow format, file extension, MIME type, save options), most compact
+# first: browsers use the first <source> type they support.
+FORMATS = [
+    ("AVIF", "avif", "image/avif", {"quality": 60, "speed": 8}),
+    ("WEBP", "webp", "image/webp", {"quality": 82, "method": 6}),
+    ("PNG", "png", "image/png", {"optimize": True}),
+]
+# Pillow writes AVIF from 11.3 and only when built with libavif; without it
+# the pages offer WebP and PNG.
+if "avif" not in features.modules or not features.check_module("avif"):
+    FORMATS = [entry for entry in FORMATS if entry[0] != "AVIF"]
+
+# The PNG fallback is reduced to a palette; the figures are flat-colour diagrams.
+PNG_COLORS = 256
+
+# Encoders release the GIL, so widths are encoded in parallel.
+ENCODE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def variant_widths(width):
+    widest = min(width, WIDTHS[-1])
+    widths = [w for w in WIDTHS if w < widest]
+    widths.append(widest)
+    return widths
+
+
+def variant_name(path, digest, width, extension):
+    return f"{path.stem}.{digest[:16]}.{width}w.{extension}"
+
+
+# ---------------------------------------------------------
+# ENCODING
+# ---------------------------------------------------------
+def encode_width(path, width, height, variants):
+    """Resize the image at `path` once and write each of `variants` (all of that width)."""
+    with Image.open(path) as image:
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        if image.size != (width, height):
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+    for variant in variants:
+        output = image
+        if variant["format"] == "PNG":
+            method = Image.Quantize.FASTOCTREE if has_alpha else Image.Quantize.MEDIANCUT
+            output = image.quantize(PNG_COLORS, method=method)
+        target = variant["path"]
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        output.save(tmp, variant["format"], **variant["options"])
+        tmp.replace(target)
+
+
+# One image is encoded at a time; each already encodes its widths in parallel.
+_encode_lock = threading.Lock()
+# Background encodes started, by image digest; each runs at most once per process.
+_background = {}
+_background_lock = threading.Lock()
+
+
+def encode_variants(path, missing):
+    """Encode `missing` ({(width, height): [variant, ...]}) for the image at `path`."""
+    with _encode_lock, span("images.build_variants", image=path.name, variants=sum(len(v) for v in missing.values())) as timing:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=ENCODE_WORKERS) as pool:
+            for future in [pool.submit(encode_width, path, w, h, group) for (w, h), group in missing.items()]:
+                future.result()
+        timing["bytes"] = sum(v["path"].stat().st_size for group in missing.values() for v in group)
+
+
+def _encode_in_background(path, missing):
+    try:
+        encode_variants(path, missing)
+    except Exception:
+        logger.exception("Encoding the variants of %s failed", path.name)
+
+
+def image_variants(path, digest, wait=True):
+    """
+    {"width", "height", "variants": [{"width", "height", "format", "mime",
+    "path"}, ...]} for the image at `path` whose sha256 is `digest`,
+    encoding the variants missing from CACHE_DIR. "width" and "height" are
+    those of the widest variant. With wait=False, missing variants are
+    encoded on a daemon thread instead and None is returned until they exist.
+    """
+    path = Path(path)
+    with Image.open(path) as image:
+        source_width, source_height = image.size
+    variants = []
+    missing = {}
+    for width in variant_widths(source_width):
+        height = max(1, round(source_height * width / source_width))
+        for image_format, extension, mime, options in FORMATS:
+            variant = {
+                "width": width,
+                "height": height,
+                "format": image_format,
+                "mime": mime,
+                "path": CACHE_DIR / variant_name(path, digest, width, extension),
+                "options": options,
+            }
+            variants.append(variant)
+            if not variant["path"].exists():
+                missing.setdefault((width, height), []).append(variant)
+    if missing and not wait:
+        with _background_lock:
+            worker = None
+            if digest not in _background:
+                worker = threading.Thread(target=_encode_in_background, args=(path, missing), daemon=True)
+                _background[digest] = worker
+        if worker is not None:
+            worker.start()
+        return None
+    if missing:
+        encode_variants(path, missing)
+    widest = variants[-1]
+    return {
+        "width": widest["width"],
+        "height": widest["height"],
+        "variants": [{key: v[key] for key in ("width", "height", "format", "mime", "path")} for v in variants],
+    }
+
+
+def main():
+    from exhyte_pages import available_images, content_hash
+
+    total_source = total_variants = 0
+    for name, path in sorted(available_images().items()):
+        if name != path.name:
+            continue  # an alias of another entry
+        result = image_variants(path, content_hash(path))
+        source_bytes = path.stat().st_size
+        sizes = {}
+        for variant in result["variants"]:
+            sizes.setdefault(variant["format"], []).append(f"{variant['width']}w {variant['path'].stat().st_size / 1e3:.0f} kB")
+        print(f"{name} ({source_bytes / 1e3:.0f} kB)")
+        for image_format, entries in sizes.items():
+            print(f"  {image_format:<5} " + ", ".join(entries))
+        total_source += source_bytes
+        total_variants += sum(v["path"].stat().st_size for v in result["variants"])
+    print(f"Sources {total_source / 1e6:.1f} MB, variants {total_variants / 1e6:.1f} MB in {CACHE_DIR}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+The Paper List as a Streamlit component (web/paper_list.js plus
+web/paper_browser.js). Filters, keyword search, highlighting and paging run
+in the browser on the payloads from paper_payload.py, so browsing the list
+does not rerun the script; Python is only called back to render a summary,
+to run a semantic search or to update the survey selection.
+"""
+from pathlib import Path
+
+import streamlit as st
+
+BASE_DIR = Path(__file__).resolve().parent
+WEB_DIR = BASE_DIR / "web"
+
+CSS = (WEB_DIR / "paper_list.css").read_text(encoding="utf-8")
+# paper_list.js defines window.PaperList; the glue module mounts it.
+JS = "\n".join((WEB_DIR / name).read_text(encoding="utf-8") for name in ("paper_list.js", "paper_browser.js"))
+
+
+def paper_browser(payloads, summaries=None, semantic=None, survey_selection=(), key="paper_browser",
+                  on_summary=None, on_semantic=None, on_survey_selection=None):
+    """
+    Mount the Paper List. `payloads` has "version" plus "papers_url" and
+    "search_url" (static serving) or the inline "papers" and "search"
+    payloads. `summaries` ({filename: html}) and `semantic` ({query:
+    [filename, ...]}) answer the browser's requests; semantic=None hides
+    "Match by meaning". The callbacks run when the browser asks for a summary
+    or a semantic search, or changes the survey selection; they read the
+    request from st.session_state[key] ("summary", "semantic",
+    "survey_selection").
+    """
+    # Registering an unchanged definition again is a no-op.
+    component = st.components.v2.component("paper_browser", css=CSS, js=JS)
+    callbacks = {
+        "on_summary_change": on_summary or (lambda: None),
+        "on_semantic_change": on_semantic or (lambda: None),
+        "on_survey_selection_change": on_survey_selection or (lambda: None),
+    }
+    return component(
+        key=key,
+        data={
+            **payloads,
+            "summaries": summaries or {},
+            "semantic": semantic,
+            "survey_selection": list(survey_selection),
+        },
+        default={"survey_selection": list(survey_selection)},
+        height="content",
+        **callbacks,
+    )
@@ -0,0 +1,131 @@
+"""
+Compact JSON payloads that let a browser filter, search and page the Paper
+List on its own (see web/paper_list.js).
+
+The paper payload holds the metadata shown in the list, every paper's facet
+value ids and its related papers; the search payload is the keyword index
+(vocabulary plus postings), loaded separately on the first search. Both are
+versioned by a hash of their content, so they can be cached indefinitely.
+"""
+import hashlib
+import json
+import os
+
+from exhyte_pages import STATIC_DIR, STATIC_URL
+from facets import FACET_MODES
+from search_index import BM25_B, BM25_K1, FIELD_LABELS
+
+# Bump when the layout of either payload changes.
+PAYLOAD_FORMAT = 1
+
+RELATED_PAPERS = 5
+
+# Field ids and term frequencies share one integer in the search postings.
+FIELD_SLOTS = 16
+
+# Published payloads, served by Streamlit's static file serving.
+DATA_DIR = STATIC_DIR / "data"
+DATA_URL = f"{STATIC_URL}/data"
+
+
+def compact_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def payload_digest(payload):
+    return hashlib.sha256(compact_json(payload).encode("utf-8")).hexdigest()[:16]
+
+
+def publish_payload(stem, payload):
+    """
+    Write `payload` into DATA_DIR under a content-hashed name and return its
+    URL. A new corpus version gets a new URL; unchanged payloads are reused.
+    """
+    target = DATA_DIR / f"{stem}.{payload_digest(payload)}.json"
+    if not target.exists():
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        tmp.write_text(compact_json(payload), encoding="utf-8")
+        tmp.replace(target)
+    return f"{DATA_URL}/{target.name}"
+
+
+def paper_url(paper):
+    url = paper.get("url", "")
+    return url if isinstance(url, str) and url.startswith(("http://", "https://")) else ""
+
+
+def build_paper_payload(papers, facet_index, similarity_index=None, related=RELATED_PAPERS):
+    """
+    {"format", "facets", "papers", ...} for `papers` (the list `facet_index`
+    was built from, in the same order). Per paper: title, authors, year,
+    venue, url, filename, content hash, facet value ids ("x", one list per
+    facet in "facet_order") and related papers ("r", [index, cosine]).
+    """
+    facet_order = list(FACET_MODES)
+    values = {facet: facet_index.paper_values(facet) for facet in facet_order}
+    rows = {paper.get("filename"): i for i, paper in enumerate(papers)}
+    records = []
+    for i, paper in enumerate(papers):
+        record = {
+            "t": paper.get("title", ""),
+            "a": paper.get("authors", ""),
+            "y": str(paper.get("year", "")),
+            "v": paper.get("venue", ""),
+            "u": paper_url(paper),
+            "f": paper.get("filename", ""),
+            "h": paper.get("content_hash", ""),
+            "x": [values[facet][i] for facet in facet_order],
+        }
+        if similarity_index is not None:
+            record["r"] = [
+                [rows[key], round(score, 3)]
+                for key, score in similarity_index.related(paper.get("filename"), k=related)
+                if key in rows
+            ]
+        records.append(record)
+    return {
+        "format": PAYLOAD_FORMAT,
+        "facet_order": facet_order,
+        "facet_modes": FACET_MODES,
+        "facets": {facet: [list(v) if isinstance(v, tuple) else v for v in facet_index.options(facet)] for facet in facet_order},
+        "papers": records,
+    }
+
+
+def build_search_payload(search_index, papers):
+    """
+    The keyword index over `papers`: a sorted vocabulary, each paper's token
+    count for BM25 and, per term, its postings as a flat integer list. Each
+    paper with the term adds [gap, n, tf * FIELD_SLOTS + field, ...] with
+    one entry for each of its n fields, where gap is the distance to the
+    previous paper index minus one (the first gap is the index itself).
+    """
+    state = search_index.export_state()
+    rows = {paper.get("filename"): i for i, paper in enumerate(papers)}
+    fields = list(FIELD_LABELS)
+    field_ids = {field: i for i, field in enumerate(fields)}
+    vocabulary = []
+    postings = []
+    for term in sorted(state["postings"]):
+        docs = sorted((rows[key], tfs) for key, tfs in state["postings"][term].items() if key in rows)
+        if not docs:
+            continue
+        encoded = []
+        previous = -1
+        for row, tfs in docs:
+            encoded.extend((row - previous - 1, len(tfs)))
+            encoded.extend(tf * FIELD_SLOTS + field_ids[field] for field, tf in tfs.items())
+            previous = row
+        vocabulary.append(term)
+        postings.append(encoded)
+    return {
+        "format": PAYLOAD_FORMAT,
+        "fields": fields,
+        "field_labels": [FIELD_LABELS[field] for field in fields],
+        "field_slots": FIELD_SLOTS,
+        "bm25": [BM25_K1, BM25_B],
+        "vocabulary": vocabulary,
+        "postings": postings,
+        "doc_lengths": [state["doc_lengths"].get(paper.get("filename"), 0) for paper in papers],
+    }
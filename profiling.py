@@ -0,0 +1,188 @@
+"""
+Opt-in timing spans for the dashboard's hot paths.
+
+Set EXHYTE_PROFILE=1 to record wall time per span, or EXHYTE_PROFILE=alloc to
+also record net Python allocations (tracemalloc, noticeably slower). Spans
+are appended to .cache/profile.jsonl and collected per script run for the
+debug panel. `python profiling.py [log]` prints p50/p95 per span.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+LOG_PATH = BASE_DIR / ".cache" / "profile.jsonl"
+
+# Bytes read from the end of the log per entry requested by read_log(limit=...).
+TAIL_BYTES_PER_ENTRY = 512
+
+_settings = {"enabled": False, "allocations": False, "log_path": LOG_PATH}
+_log_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure(mode=None, log_path=LOG_PATH):
+    """Enable profiling for mode "1"/"on" (timings) or "alloc"; anything else disables it."""
+    mode = (mode or "").strip().lower()
+    _settings["enabled"] = mode in ("1", "true", "on", "yes", "alloc")
+    _settings["allocations"] = mode == "alloc"
+    _settings["log_path"] = Path(log_path)
+    if _settings["allocations"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    return _settings["enabled"]
+
+
+configure(os.environ.get("EXHYTE_PROFILE"))
+
+
+# ---------------------------------------------------------
+# RUNS
+# ---------------------------------------------------------
+def start_run():
+    """
+    Start collecting this thread's spans (one Streamlit script run). Each
+    rerun gets a new script thread, so spans of fragment reruns and worker
+    threads are only logged.
+    """
+    _local.run = {"id": uuid.uuid4().hex[:12], "started": time.perf_counter(), "spans": []}
+    return _local.run
+
+
+def finish_run(**payload):
+    """Log the whole run as a "script.run" span and return the run."""
+    run = current_run()
+    if run is None:
+        return None
+    entry = {"span": "script.run", "seconds": round(time.perf_counter() - run["started"], 6), "ts": round(time.time(), 3)}
+    entry.update(payload, run=run["id"])
+    run["spans"].append(entry)
+    _append(entry)
+    _local.run = None
+    return run
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+# ---------------------------------------------------------
+# SPANS
+# ---------------------------------------------------------
+class _NullSpan(dict):
+    def __setitem__(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def span(name, **payload):
+    """
+    Time the enclosed block as `name`. Yields a dict for payload sizes known
+    only at the end (e.g. `s["results"] = len(rows)`). A no-op when
+    profiling is disabled.
+    """
+    if not _settings["enabled"]:
+        yield _NULL_SPAN
+        return
+    record = dict(payload)
+    allocations = _settings["allocations"] and tracemalloc.is_tracing()
+    alloc_start = tracemalloc.get_traced_memory()[0] if allocations else 0
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - started
+        entry = {"span": name, "seconds": round(seconds, 6), "ts": round(time.time(), 3)}
+        if allocations:
+            entry["alloc_kb"] = round((tracemalloc.get_traced_memory()[0] - alloc_start) / 1024, 1)
+        entry.update(record)
+        # Spans in job and prerender threads are logged without a run.
+        run = current_run()
+        if run is not None:
+            entry["run"] = run["id"]
+            run["spans"].append(entry)
+        _append(entry)
+
+
+def _append(entry):
+    path = _settings["log_path"]
+    line = json.dumps(entry, default=str) + "\n"
+    try:
+        with _log_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------
+# AGGREGATION
+# ---------------------------------------------------------
+def read_log(path=None, limit=None):
+    """Span entries from the JSONL log; with `limit`, about the last `limit` (read from the end)."""
+    path = Path(path or _settings["log_path"])
+    try:
+        with open(path, "rb") as f:
+            if limit:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - limit * TAIL_BYTES_PER_ENTRY))
+            data = f.read()
+    except OSError:
+        return []
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if limit:
+        # The first line may start mid-entry; it fails to parse and is skipped.
+        lines = lines[-limit:]
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(entries):
+    """Per-span count, p50, p95 and max of wall time in ms, slowest p95 first."""
+    by_span = {}
+    for entry in entries:
+        by_span.setdefault(entry["span"], []).append(entry["seconds"] * 1000)
+    rows = []
+    for name, values in by_span.items():
+        values.sort()
+        rows.append({
+            "span": name,
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "max_ms": round(values[-1], 2),
+        })
+    return sorted(rows, key=lambda row: -row["p95_ms"])
+
+
+if __name__ == "__main__":
+    rows = summarize(read_log(sys.argv[1] if len(sys.argv) > 1 else LOG_PATH))
+    print(f"{'span':<36} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for row in rows:
+        print(f"{row['span']:<36} {row['count']:>7} {row['p50_ms']:>10} {row['p95_ms']:>10} {row['max_ms']:>10}")
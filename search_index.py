@@ -0,0 +1,272 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+
+from corpus import load_full_data
+
+# ---------------------------------------------------------
+# FIELDS
+# ---------------------------------------------------------
+# Summary sections that get their own per-field hits; everything else in the
+# paper JSON is indexed under "other".
+SECTION_FIELDS = {
+    "objective": "objective",
+    "knowledge_gap": "knowledge_gap",
+    "novelty": "novelty",
+    "inspirational_papers": "inspirational_papers",
+    "method": "method",
+    "performance_summary": "performance",
+    "subject_area": "subject_area",
+    "limitations": "limitations",
+    "future_directions": "future_directions",
+}
+
+FIELD_LABELS = {
+    "title": "Title",
+    "authors": "Authors",
+    "objective": "Objective",
+    "knowledge_gap": "Knowledge Gap",
+    "novelty": "Novelty",
+    "inspirational_papers": "Inspirational Papers",
+    "method": "Method",
+    "performance": "Performance",
+    "subject_area": "Subject Area",
+    "limitations": "Limitations",
+    "future_directions": "Future Directions",
+    "other": "Other",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def iter_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_strings(item)
+
+
+def paper_fields(paper):
+    """Split a paper record into the {field: text} mapping that gets indexed."""
+    data = load_full_data(paper, cache=False) if "path" in paper or "full_data" in paper else {}
+    fields = {
+        "title": paper.get("title", ""),
+        "authors": paper.get("authors", ""),
+    }
+    other = []
+    for key, value in data.items():
+        if key in ("paper_title", "authors"):
+            continue
+        field = SECTION_FIELDS.get(key, "other")
+        text = " ".join(iter_strings(value))
+        if field == "other":
+            other.append(text)
+        else:
+            fields[field] = text
+    fields["other"] = " ".join(other)
+    return fields
+
+
+# ---------------------------------------------------------
+# QUERY PARSING
+# ---------------------------------------------------------
+def parse_query(query):
+    """
+    Parse a keyword query into OR-groups of AND-ed terms.
+
+    - whitespace separates terms that must all match
+    - ``OR`` (or ``|``) separates alternatives
+    - ``field:term`` restricts a term to one field (e.g. ``method:graph``)
+    - terms match as prefixes (``graph`` finds ``graphs``); quote a term for
+      an exact match (``"graph"``)
+
+    Returns a list of groups, each a list of (field, token, exact) tuples.
+    """
+    groups = [[]]
+    for raw in re.findall(r'(?:\w+:)?"[^"]*"|\S+', query):
+        if raw in ("OR", "|"):
+            if groups[-1]:
+                groups.append([])
+            continue
+        field = None
+        if ":" in raw and not raw.startswith('"'):
+            prefix, rest = raw.split(":", 1)
+            if prefix.lower() in FIELD_LABELS:
+                field, raw = prefix.lower(), rest
+        exact = raw.startswith('"')
+        for token in tokenize(raw.strip('"*')):
+            groups[-1].append((field, token, exact))
+    return [group for group in groups if group]
+
+
+# ---------------------------------------------------------
+# INDEX
+# ---------------------------------------------------------
+class SearchIndex:
+    """
+    Inverted index over paper records with BM25 ranking.
+
+    Postings map token -> {doc_key: {field: term_frequency}}. Documents are
+    keyed by filename; sync() only reindexes records that changed.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._docs = {}
+        self._doc_tokens = {}
+        self._doc_lengths = {}
+        self._total_length = 0
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def sync(self, papers):
+        """Index new or changed records and drop ones no longer in `papers`."""
+        with self._lock:
+            current = {}
+            for paper in papers:
+                current[paper.get("filename") or paper.get("title", "")] = paper
+            for key in [key for key in self._docs if key not in current]:
+                self._remove(key)
+            for key, paper in current.items():
+                if self._docs.get(key) is not paper:
+                    self._remove(key)
+                    self._add(key, paper)
+
+    def export_state(self):
+        """Picklable index state; records are shared with the corpus when pickled together."""
+        with self._lock:
+            return {
+                "postings": self._postings,
+                "docs": self._docs,
+                "doc_tokens": self._doc_tokens,
+                "doc_lengths": self._doc_lengths,
+                "total_length": self._total_length,
+            }
+
+    def restore_state(self, state):
+        with self._lock:
+            self._postings = state["postings"]
+            self._docs = state["docs"]
+            self._doc_tokens = state["doc_tokens"]
+            self._doc_lengths = state["doc_lengths"]
+            self._total_length = state["total_length"]
+            self._vocabulary_dirty = True
+
+    def _add(self, key, paper):
+        tokens = set()
+        length = 0
+        for field, text in paper_fields(paper).items():
+            for token in tokenize(text):
+                fields = self._postings.setdefault(token, {}).setdefault(key, {})
+                fields[field] = fields.get(field, 0) + 1
+                tokens.add(token)
+                length += 1
+        self._docs[key] = paper
+        self._doc_tokens[key] = tokens
+        self._doc_lengths[key] = length
+        self._total_length += length
+        self._vocabulary_dirty = True
+
+    def _remove(self, key):
+        if key not in self._docs:
+            return
+        for token in self._doc_tokens.pop(key):
+            postings = self._postings[token]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+        self._total_length -= self._doc_lengths.pop(key)
+        del self._docs[key]
+        self._vocabulary_dirty = True
+
+    def _expand(self, token, exact):
+        if exact:
+            return [token] if token in self._postings else []
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        matches = []
+        position = bisect_left(self._vocabulary, token)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(token):
+            matches.append(self._vocabulary[position])
+            position += 1
+        return matches
+
+    def _match_term(self, field, token, exact):
+        """Return {doc_key: [(term, tf, fields_hit), ...]} for one query term."""
+        hits = {}
+        for term in self._expand(token, exact):
+            for key, fields in self._postings[term].items():
+                if field:
+                    if field not in fields:
+                        continue
+                    tf = fields[field]
+                    hit_fields = (field,)
+                else:
+                    tf = sum(fields.values())
+                    hit_fields = tuple(fields)
+                hits.setdefault(key, []).append((term, tf, hit_fields))
+        return hits
+
+    def search(self, query):
+        """
+        Return hits for `query` ranked by BM25, best first.
+
+        Each hit is a dict with the paper record, its score and the fields
+        (see FIELD_LABELS) in which the query terms occurred.
+        """
+        groups = parse_query(query)
+        if not groups:
+            return []
+        with self._lock:
+            n_docs = len(self._docs)
+            avg_length = (self._total_length / n_docs) if n_docs else 0.0
+            scores = {}
+            hit_fields = {}
+            for group in groups:
+                matched = None
+                group_hits = []
+                for field, token, exact in group:
+                    term_hits = self._match_term(field, token, exact)
+                    keys = set(term_hits)
+                    matched = keys if matched is None else matched & keys
+                    group_hits.append(term_hits)
+                    if not matched:
+                        break
+                for key in matched or ():
+                    doc_length = self._doc_lengths[key] or 1
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / (avg_length or 1))
+                    score = 0.0
+                    for term_hits in group_hits:
+                        for term, tf, fields in term_hits[key]:
+                            df = len(self._postings[term])
+                            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                            score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                            hit_fields.setdefault(key, set()).update(fields)
+                    scores[key] = max(scores.get(key, 0.0), score)
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            return [
+                {
+                    "paper": self._docs[key],
+                    "score": score,
+                    "fields": [field for field in FIELD_LABELS if field in hit_fields[key]],
+                }
+                for key, score in ranked
+            ]
@@ -0,0 +1,236 @@
+import logging
+import math
+import threading
+
+import numpy as np
+
+from corpus import load_full_data
+from search_index import iter_strings, tokenize
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# SETTINGS
+# ---------------------------------------------------------
+# Summary sections that describe what a paper is about; the title is added too.
+SIMILARITY_FIELDS = ("objective", "novelty", "method")
+
+# LSA: TF-IDF over terms found in at least MIN_DF papers and at most MAX_DF of
+# them, projected onto up to DIMENSIONS latent topics.
+DIMENSIONS = 128
+MIN_DF = 2
+MAX_DF = 0.5
+MAX_FEATURES = 50_000
+POWER_ITERATIONS = 3
+OVERSAMPLES = 10
+
+
+def paper_text(paper):
+    data = load_full_data(paper, cache=False) if "path" in paper or "full_data" in paper else {}
+    parts = [paper.get("title", "")]
+    for field in SIMILARITY_FIELDS:
+        parts.extend(iter_strings(data.get(field)))
+    return " ".join(parts)
+
+
+def term_counts(text):
+    counts = {}
+    for token in tokenize(text):
+        if not token.isdigit():
+            counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+# ---------------------------------------------------------
+# SPARSE HELPERS
+# ---------------------------------------------------------
+# Rows are (columns, weights) pairs; the TF-IDF matrix is never materialized.
+def sparse_dot(rows, matrix):
+    """rows (n × V, sparse) @ matrix (V × k)."""
+    out = np.zeros((len(rows), matrix.shape[1]), dtype=np.float32)
+    for i, (cols, weights) in enumerate(rows):
+        if len(cols):
+            out[i] = weights @ matrix[cols]
+    return out
+
+
+def sparse_transpose_dot(rows, matrix, n_columns):
+    """rows.T (V × n, sparse) @ matrix (n × k)."""
+    out = np.zeros((n_columns, matrix.shape[1]), dtype=np.float32)
+    for i, (cols, weights) in enumerate(rows):
+        if len(cols):
+            out[cols] += weights[:, None] * matrix[i]
+    return out
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+# ---------------------------------------------------------
+# INDEX
+# ---------------------------------------------------------
+class SimilarityIndex:
+    """
+    Latent semantic index over the objective, novelty and method sections.
+
+    Papers are TF-IDF weighted and projected onto the top singular vectors
+    (randomized SVD over the sparse rows), giving one unit-length float32 row
+    per paper in `vectors`. related() and search() are a single matrix-vector
+    product plus a partial sort. Works offline and needs only NumPy.
+    """
+
+    def __init__(self, papers, dimensions=DIMENSIONS, min_df=MIN_DF, max_df=MAX_DF, seed=0):
+        self.keys = [paper.get("filename") or paper.get("title", "") for paper in papers]
+        self.signature = self.papers_signature(papers)
+        self._rows = {key: i for i, key in enumerate(self.keys)}
+
+        counts = [term_counts(paper_text(paper)) for paper in papers]
+        n_docs = len(counts)
+        df = {}
+        for doc in counts:
+            for token in doc:
+                df[token] = df.get(token, 0) + 1
+        max_docs = max(min_df, max_df * n_docs)
+        terms = sorted(
+            (token for token, n in df.items() if min_df <= n <= max_docs),
+            key=lambda token: (-df[token], token),
+        )[:MAX_FEATURES]
+        self.vocabulary = {token: i for i, token in enumerate(sorted(terms))}
+        self.idf = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for token, col in self.vocabulary.items():
+            self.idf[col] = math.log((1 + n_docs) / (1 + df[token])) + 1
+
+        rows = [self._weigh(doc) for doc in counts]
+        # Small corpora get fewer topics; with about one topic per paper LSA
+        # degenerates into plain TF-IDF matching.
+        k = min(dimensions, max(1, n_docs // 4), len(self.vocabulary))
+        if k == 0:
+            self.components = np.zeros((0, len(self.vocabulary)), dtype=np.float32)
+            self.vectors = np.zeros((n_docs, 0), dtype=np.float32)
+            return
+
+        # Randomized range finder (Halko et al.) with a few power iterations.
+        rng = np.random.default_rng(seed)
+        n_terms = len(self.vocabulary)
+        sample = min(k + OVERSAMPLES, n_docs, n_terms)
+        basis, _ = np.linalg.qr(sparse_dot(rows, rng.standard_normal((n_terms, sample)).astype(np.float32)))
+        for _ in range(POWER_ITERATIONS):
+            projected, _ = np.linalg.qr(sparse_transpose_dot(rows, basis, n_terms))
+            basis, _ = np.linalg.qr(sparse_dot(rows, projected))
+        small = sparse_transpose_dot(rows, basis, n_terms).T
+        u, s, vt = np.linalg.svd(small, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:k], dtype=np.float32)
+        self.vectors = normalize_rows((basis @ u[:, :k]) * s[:k]).astype(np.float32)
+
+    @staticmethod
+    def papers_signature(papers):
+        return tuple(sorted((paper.get("filename", ""), paper.get("content_hash", "")) for paper in papers))
+
+    def matches(self, papers):
+        """True if the index was built from exactly these papers."""
+        return self.signature == self.papers_signature(papers)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _weigh(self, counts):
+        cols, weights = [], []
+        for token, n in counts.items():
+            col = self.vocabulary.get(token)
+            if col is not None:
+                cols.append(col)
+                weights.append((1 + math.log(n)) * self.idf[col])
+        cols = np.array(cols, dtype=np.int64)
+        weights = np.array(weights, dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        return cols, weights / norm if norm else weights
+
+    def _ranked(self, vector, k, exclude=None):
+        if not len(self.keys) or not vector.any():
+            return []
+        scores = self.vectors @ vector
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        return [
+            (self.keys[i], float(scores[i]))
+            for i in top_k(scores, k)
+            if np.isfinite(scores[i])
+        ]
+
+    def related(self, key, k=5):
+        """[(key, cosine)] of the k papers closest to the paper with `key`."""
+        row = self._rows.get(key)
+        if row is None:
+            return []
+        return self._ranked(self.vectors[row], k, exclude=row)
+
+    def search(self, text, k=20):
+        """[(key, cosine)] of the k papers closest to free text."""
+        cols, weights = self._weigh(term_counts(text))
+        if not len(cols):
+            return []
+        vector = weights @ self.components[:, cols].T
+        norm = np.linalg.norm(vector)
+        return self._ranked(vector / norm if norm else vector, k)
+
+
+# ---------------------------------------------------------
+# BACKGROUND REBUILDS
+# ---------------------------------------------------------
+class SimilarityCache:
+    """
+    The similarity index of a paper list that changes over time. Building
+    takes seconds, so current() never builds on the caller's thread: when
+    the index is stale it starts a rebuild on a daemon thread and keeps
+    returning the previous index (None before the first build) until the new
+    one is ready. `version` changes whenever the index is replaced.
+    """
+
+    def __init__(self, index=None):
+        self.index = index
+        self.version = 0
+        self._source = None
+        self._building = None
+        self._lock = threading.Lock()
+
+    def current(self, papers):
+        """The newest index, starting a rebuild if it was not built from `papers`."""
+        with self._lock:
+            # The corpus replaces its list on change, so identity is the usual check.
+            if papers is self._source or papers is self._building:
+                return self.index
+            if self.index is not None and self.index.matches(papers):
+                self._source = papers
+                return self.index
+            self._building = papers
+            worker = threading.Thread(target=self._build, args=(papers,), daemon=True)
+        worker.start()
+        return self.index
+
+    def _build(self, papers):
+        try:
+            index = SimilarityIndex(papers)
+        except Exception:
+            logger.exception("Building the similarity index failed")
+            index = None
+        with self._lock:
+            if papers is not self._building:
+                return  # superseded by a newer paper list
+            self._building = None
+            # A failed build is not retried until the papers change again.
+            self._source = papers
+            if index is not None:
+                self.index = index
+                self.version += 1
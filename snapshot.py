@@ -0,0 +1,110 @@
+import logging
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+from corpus import PaperCorpus
+from exhyte_annotations import annotation_corpus
+from exhyte_pages import build_all_pages
+from profiling import span
+from search_index import SearchIndex
+from similarity import SimilarityIndex
+from summaries import RENDERER_VERSION, SummaryStore
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Everything a cold start needs, written by `python snapshot.py` and read
+# back with a single file read.
+SNAPSHOT_PATH = BASE_DIR / ".cache" / "corpus.snapshot"
+
+# Bump when the layout of the payload or of any exported state changes.
+SNAPSHOT_FORMAT = "4"
+
+
+def snapshot_version():
+    return f"{SNAPSHOT_FORMAT}/{RENDERER_VERSION}/py{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+# ---------------------------------------------------------
+# BUILD
+# ---------------------------------------------------------
+def build_snapshot(path=SNAPSHOT_PATH, directory_name="Papers"):
+    """
+    Parse the corpus and annotations, build the search and similarity
+    indexes, render every summary and the EXHYTE pages, and write the result to `path`.
+    Returns a small report dict.
+    """
+    started = time.perf_counter()
+    papers = PaperCorpus(directory_name)
+    papers.refresh(force=True)
+    annotations = annotation_corpus()
+    annotations.refresh(force=True)
+
+    index = SearchIndex()
+    index.sync(papers.papers)
+    similarity = SimilarityIndex(papers.papers)
+    summaries = SummaryStore().export(papers.papers)
+    # Pages have their own per-page disk cache; building them here warms it.
+    for mode in ("static", "inline"):
+        build_all_pages(mode)
+
+    # Pickled as one object so the index shares the corpus' record objects.
+    payload = {
+        "version": snapshot_version(),
+        "created_at": time.time(),
+        "papers": papers.export_state(),
+        "annotations": annotations.export_state(),
+        "search_index": index.export_state(),
+        "similarity": similarity,
+        "summaries": summaries,
+    }
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    return {
+        "path": str(path),
+        "bytes": len(data),
+        "papers": len(papers.papers),
+        "annotations": len(annotations.papers),
+        "errors": len(papers.errors()) + len(annotations.errors()),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# ---------------------------------------------------------
+# LOAD
+# ---------------------------------------------------------
+def load_snapshot(path=SNAPSHOT_PATH):
+    """
+    The snapshot payload, or None when there is none or it was written by an
+    incompatible version. Staleness of individual files is left to
+    PaperCorpus.refresh(), which reparses only what changed since the build.
+    """
+    try:
+        with span("snapshot.load") as timing:
+            data = Path(path).read_bytes()
+            timing["bytes"] = len(data)
+            payload = pickle.loads(data)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning("Ignoring snapshot %s: %s", path, e)
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != snapshot_version():
+        return None
+    return payload
+
+
+if __name__ == "__main__":
+    # Build: python snapshot.py [papers directory]
+    report = build_snapshot(directory_name=sys.argv[1] if len(sys.argv) > 1 else "Papers")
+    print(
+        f"Wrote {report['path']} ({report['bytes'] / 1e6:.1f} MB): {report['papers']} papers, "
+        f"{report['annotations']} annotations, {report['errors']} errors in {report['seconds']:.1f}s"
+    )
@@ -0,0 +1,253 @@
+"""
+Export the read-only parts of the dashboard as a static site.
+
+    python static_export.py [output directory] [--app-url https://host/exhyte]
+
+Writes the three EXHYTE pages, the Paper List (filtering, keyword search,
+summaries and related papers run in the browser) and the figures into one
+directory that any static web server or CDN can host. Data, assets and
+images have content-hashed names and can be cached indefinitely; only
+index.html needs revalidation. The Survey Generator needs the live app;
+--app-url links to it.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from string import Template
+
+from corpus import PaperCorpus
+from exhyte_annotations import AnnotationMatrix, annotation_corpus
+from exhyte_pages import FILES, available_images, process_html_content, responsive_image
+from facets import FacetIndex
+from paper_payload import build_paper_payload, build_search_payload, compact_json, payload_digest
+from search_index import SearchIndex
+from similarity import SimilarityIndex
+from summaries import RENDERER_VERSION, SummaryStore
+
+BASE_DIR = Path(__file__).resolve().parent
+
+EXPORT_DIR = BASE_DIR / "site"
+WEB_DIR = BASE_DIR / "web"
+
+# Written into every export; only directories holding it are ever replaced.
+MARKER_NAME = ".exhyte-export"
+
+# Tabs of the exported site: (page key in FILES, file name, label).
+PAGES = [
+    ("tab1_html", "framework.html", "The EXHYTE Framework"),
+    ("tab2_html", "ai-methods.html", "AI Methods for EXHYTE"),
+    ("tab3_html", "tools-datasets.html", "Tools & Datasets"),
+]
+
+# Netlify / Cloudflare Pages cache headers; other hosts need the same rules in their own config.
+HEADERS = """/index.html
+  Cache-Control: no-cache
+/assets/*
+  Cache-Control: public, max-age=31536000, immutable
+/data/*
+  Cache-Control: public, max-age=31536000, immutable
+/images/*
+  Cache-Control: public, max-age=31536000, immutable
+"""
+
+INDEX_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>AI4Research — EXHYTE Dashboard</title>
+<link rel="stylesheet" href="$css">
+<style>
+body { margin: 0; font-family: "Source Sans Pro", sans-serif; color: #31333f; }
+nav { display: flex; flex-wrap: wrap; gap: 4px; padding: 12px 24px 0; border-bottom: 1px solid #ddd; position: sticky; top: 0; background: #fff; z-index: 1; }
+nav a { padding: 8px 14px; color: #31333f; text-decoration: none; border-bottom: 2px solid transparent; }
+nav a.active { color: #ff4b4b; border-bottom-color: #ff4b4b; }
+main { padding: 16px 24px; }
+.tab { display: none; }
+.tab.active { display: block; }
+iframe { width: 100%; height: 1350px; border: 0; }
+</style>
+</head>
+<body>
+<nav>$nav</nav>
+<main>
+$tabs
+<section class="tab" id="papers"><div id="paper-list">Loading…</div></section>
+<section class="tab" id="survey">
+<h3>Scientific Survey Generator</h3>
+$survey
+</section>
+</main>
+<script src="$js"></script>
+<script>
+(function () {
+  var paperList = null;
+  function mountPaperList() {
+    if (paperList) return;
+    paperList = fetch("$papers").then(function (r) { return r.json(); }).then(function (payload) {
+      var root = document.getElementById("paper-list");
+      root.textContent = "";
+      return PaperList.mount(root, {
+        payload: payload,
+        loadSearch: function () { return fetch("$search").then(function (r) { return r.json(); }); },
+        loadSummary: function (paper) {
+          return fetch("$summaries" + paper.h + ".html").then(function (r) {
+            if (!r.ok) throw new Error(r.status);
+            return r.text();
+          });
+        }
+      });
+    }).catch(function () {
+      paperList = null;
+      document.getElementById("paper-list").textContent = "The paper list could not be loaded.";
+    });
+  }
+  function show() {
+    var id = location.hash.slice(1) || "$first";
+    if (!document.getElementById(id)) id = "$first";
+    document.querySelectorAll(".tab").forEach(function (tab) { tab.classList.toggle("active", tab.id === id); });
+    document.querySelectorAll("nav a").forEach(function (a) { a.classList.toggle("active", a.getAttribute("href") === "#" + id); });
+    var frame = document.querySelector("#" + id + " iframe[data-src]");
+    if (frame) { frame.src = frame.getAttribute("data-src"); frame.removeAttribute("data-src"); }
+    if (id === "papers") mountPaperList();
+  }
+  window.addEventListener("hashchange", show);
+  show();
+})();
+</script>
+</body>
+</html>
+""")
+
+
+def write_text(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def write_hashed(directory, stem, suffix, text):
+    """Write `text` under a content-hashed name; returns that name."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    name = f"{stem}.{digest}{suffix}"
+    write_text(directory / name, text)
+    return name
+
+
+# ---------------------------------------------------------
+# EXPORT
+# ---------------------------------------------------------
+def export_site(output_dir=EXPORT_DIR, directory_name="Papers", app_url=None):
+    """
+    Build the site in a temporary directory next to `output_dir`, then swap it
+    in, so a web server pointed at `output_dir` never sees a partial export.
+    Returns a small report dict.
+    """
+    started = time.perf_counter()
+    output_dir = Path(output_dir).resolve()
+    if output_dir.exists() and any(output_dir.iterdir()) and not (output_dir / MARKER_NAME).exists():
+        raise FileExistsError(f"{output_dir} is not empty and was not written by this exporter.")
+    build_dir = output_dir.with_name(f"{output_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+    papers = PaperCorpus(directory_name).refresh(force=True)
+    annotations = annotation_corpus().refresh(force=True)
+    facet_index = FacetIndex(papers, AnnotationMatrix(annotations, papers))
+    search_index = SearchIndex()
+    search_index.sync(papers)
+    similarity = SimilarityIndex(papers) if papers else None
+
+    # Figures as responsive, lazily loaded variants, linked by relative URL.
+    image_map = {name: responsive_image(path, build_dir / "images", "images") for name, path in available_images().items()}
+
+    tabs = []
+    for key, file_name, label in PAGES:
+        source = BASE_DIR / FILES[key]
+        if not source.is_file():
+            print(f"Skipping {label}: {FILES[key]} not found.", file=sys.stderr)
+            continue
+        write_text(build_dir / file_name, process_html_content(source.read_text(encoding="utf-8"), image_map))
+        tabs.append((file_name.rsplit(".", 1)[0], label, f'<iframe data-src="{file_name}" title="{html.escape(label)}" loading="lazy"></iframe>'))
+
+    data_dir = build_dir / "data"
+    paper_payload = build_paper_payload(papers, facet_index, similarity)
+    search_payload = build_search_payload(search_index, papers)
+    papers_name = f"papers.{payload_digest(paper_payload)}.json"
+    search_name = f"search.{payload_digest(search_payload)}.json"
+    write_text(data_dir / papers_name, compact_json(paper_payload))
+    write_text(data_dir / search_name, compact_json(search_payload))
+    # Summaries keep their name until the paper changes, so the renderer version is part of the path.
+    summaries_path = f"data/summaries/{RENDERER_VERSION}/"
+    summary_store = SummaryStore()
+    for paper in papers:
+        if paper.get("content_hash"):
+            write_text(build_dir / summaries_path / f"{paper['content_hash']}.html", summary_store.get(paper))
+
+    assets_dir = build_dir / "assets"
+    js_name = write_hashed(assets_dir, "paper_list", ".js", (WEB_DIR / "paper_list.js").read_text(encoding="utf-8"))
+    css_name = write_hashed(assets_dir, "paper_list", ".css", (WEB_DIR / "paper_list.css").read_text(encoding="utf-8"))
+
+    if app_url:
+        survey = f'<p>Surveys are generated by the live dashboard: <a href="{html.escape(app_url)}">open the Survey Generator</a>.</p>'
+    else:
+        survey = "<p>Surveys are generated by the live dashboard, which this static copy does not include.</p>"
+    nav = [(tab_id, label) for tab_id, label, _ in tabs] + [("papers", "Paper List"), ("survey", "Survey Generator")]
+    write_text(build_dir / "index.html", INDEX_TEMPLATE.substitute(
+        css=f"assets/{css_name}",
+        js=f"assets/{js_name}",
+        papers=f"data/{papers_name}",
+        search=f"data/{search_name}",
+        summaries=summaries_path,
+        first=nav[0][0],
+        nav="".join(f'<a href="#{tab_id}">{html.escape(label)}</a>' for tab_id, label in nav),
+        tabs="\n".join(f'<section class="tab" id="{tab_id}">{frame}</section>' for tab_id, _, frame in tabs),
+        survey=survey,
+    ))
+    write_text(build_dir / "_headers", HEADERS)
+    report = {
+        "created_at": time.time(),
+        "papers": len(papers),
+        "pages": len(tabs),
+        "images": len(image_map),
+        "papers_payload": papers_name,
+        "search_payload": search_name,
+    }
+    write_text(build_dir / MARKER_NAME, json.dumps(report, indent=2))
+
+    if output_dir.exists():
+        previous = output_dir.with_name(f"{output_dir.name}.{os.getpid()}.old")
+        output_dir.replace(previous)
+        build_dir.replace(output_dir)
+        shutil.rmtree(previous, ignore_errors=True)
+    else:
+        build_dir.replace(output_dir)
+
+    report["path"] = str(output_dir)
+    report["bytes"] = sum(path.stat().st_size for path in output_dir.rglob("*") if path.is_file())
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", nargs="?", type=Path, default=EXPORT_DIR, help="output directory (default: site/)")
+    parser.add_argument("--papers", default="Papers", help="papers directory")
+    parser.add_argument("--app-url", help="URL of the live dashboard, linked from the Survey Generator tab")
+    args = parser.parse_args(argv)
+    try:
+        report = export_site(args.output, args.papers, args.app_url)
+    except FileExistsError as e:
+        parser.error(str(e))
+    print(
+        f"Exported {report['papers']} papers, {report['pages']} pages and {report['images']} images "
+        f"to {report['path']} ({report['bytes'] / 1e6:.1f} MB) in {report['seconds']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
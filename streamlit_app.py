@@ -1,13 +1,41 @@
 import streamlit as st
-import base64
-import html as html_lib
-import re
-import json
+import altair as alt
+import math
+import os
+import time
+import pandas as pd
 from pathlib import Path
-from bs4 import BeautifulSoup
-from openai import OpenAI 
 
-BASE_DIR = Path(__file__).resolve().parent
+from api_clients import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, ClientPool
+from corpus import PaperCorpus, load_full_data
+from exhyte_annotations import AnnotationMatrix, annotation_corpus
+from exhyte_pages import FILES, build_page
+from exhyte_stats import STEP_NAMES, WorkflowStats
+from facets import FacetIndex
+from paper_browser import paper_browser
+from paper_payload import build_paper_payload, build_search_payload, payload_digest, publish_payload
+from profiling import enabled as profiling_enabled, finish_run, read_log, span, start_run, summarize
+from search_index import SearchIndex
+from similarity import SimilarityCache
+from snapshot import load_snapshot
+from summaries import SummaryStore
+from survey import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    estimate_cost,
+    pack_survey_prompt,
+    survey_request_params,
+)
+from survey_cache import SurveyCache, survey_cache_key
+from survey_jobs import (
+    ACTIVE_STATUSES as SURVEY_JOB_ACTIVE_STATUSES,
+    DEFAULT_MAX_QUEUED,
+    DEFAULT_MAX_WORKERS,
+    QueueFull,
+    SurveyJobQueue,
+    survey_job,
+)
 
 # ---------------------------------------------------------
 # Page setup
@@ -17,343 +45,110 @@ st.set_page_config(
     layout="wide"
 )
 
-# ---------------------------------------------------------
-# HELPER: GENERATE STRUCTURED SUMMARY HTML
-# ---------------------------------------------------------
-def generate_summary_html(data):
-    """
-    Parses JSON with ROBUST handling for lists of dictionaries.
-    """
-    html_parts = []
-    
-    # --- HELPER: HEADER ---
-    def make_header(emoji, text):
-        return f"<div style='margin-top: 18px; margin-bottom: 8px; font-weight: bold; font-size: 1.1em; border-bottom: 1px solid #ddd; padding-bottom: 4px; color: #000; font-family: \"Times New Roman\", serif;'>{emoji} {text}</div>"
-
-    # --- HELPER: EVIDENCE ---
-    def render_evidence(data_dict_or_str):
-        if isinstance(data_dict_or_str, dict) and "evidence" in data_dict_or_str and data_dict_or_str["evidence"]:
-            ev = data_dict_or_str["evidence"]
-            if isinstance(ev, list):
-                ev_text = "<br>• ".join(ev)
-                if len(ev) > 0: ev_text = "• " + ev_text
-            else:
-                ev_text = str(ev)
-            return f"<div style='margin-top: 4px; font-size: 0.9em; color: #555; background-color: #f4f4f4; padding: 6px; border-radius: 4px;'><em>📌 Evidence: {ev_text}</em></div>"
-        return ""
-
-    # --- HELPER: RENDER CONTENT ---
-    def render_content(content):
-        # CASE 1: List of items
-        if isinstance(content, list):
-            html = "<ul>"
-            for item in content:
-                html += "<li style='margin-bottom:8px;'>"
-                if isinstance(item, dict):
-                    label = item.get("label") or item.get("name") or item.get("step") or ""
-                    desc = item.get("explanation") or item.get("description") or item.get("answer") or ""
-                    
-                    text_part = ""
-                    if label:
-                        text_part += f"<strong>{html_lib.escape(str(label))}</strong>"
-                        if desc: text_part += f": {html_lib.escape(str(desc))}"
-                    elif desc:
-                        text_part += f"{html_lib.escape(str(desc))}"
-                    
-                    html += f"<div>{text_part}</div>"
-                    html += render_evidence(item)
-                else:
-                    html += f"{html_lib.escape(str(item))}"
-                html += "</li>"
-            html += "</ul>"
-            return html
-        # CASE 2: Single String
-        elif isinstance(content, str):
-            return f"<div>{html_lib.escape(content)}</div>"
-        return ""
-
-    # SECTIONS
-    if "objective" in data and data["objective"]:
-        d = data["objective"]
-        html = make_header("🎯", "Objective")
-        html += "<div style='margin-left: 10px;'>" + render_content(d.get("answer", "")) + render_evidence(d) + "</div>"
-        html_parts.append(html)
-
-    if "knowledge_gap" in data and data["knowledge_gap"]:
-        d = data["knowledge_gap"]
-        html = make_header("🧩", "Knowledge Gap")
-        html += "<div style='margin-left: 10px;'>" + render_content(d.get("answer", "")) + render_evidence(d) + "</div>"
-        html_parts.append(html)
-
-    if "novelty" in data and data["novelty"]:
-        d = data["novelty"]
-        html = make_header("✨", "Novelty")
-        html += "<div style='margin-left: 10px;'>" + render_content(d.get("answer", "")) + render_evidence(d) + "</div>"
-        html_parts.append(html)
-
-    if "inspirational_papers" in data and data["inspirational_papers"]:
-        d = data["inspirational_papers"]
-        html = make_header("💡", "Inspirational Papers")
-        html += "<div style='margin-left: 10px;'>" + render_content(d.get("answer", "")) + render_evidence(d) + "</div>"
-        html_parts.append(html)
-
-    if "method" in data and data["method"]:
-        d = data["method"]
-        html = make_header("⚙️", "Method")
-        html += "<div style='margin-left: 10px;'>"
-        if "steps" in d and isinstance(d["steps"], list):
-            for step in d["steps"]:
-                step_name = step.get("step", "Step")
-                html += f"<div style='margin-top: 10px; background-color: #fff; border: 1px solid #e0e0e0; padding: 10px; border-radius: 5px; box-shadow: 0 1px 2px rgba(0,0,0,0.05);'>"
-                html += f"<div style='font-weight: bold; color: #333; margin-bottom: 4px;'>{step_name}</div>"
-                if "input" in step: html += f"<div style='font-size: 0.95em;'><strong>Input:</strong> {step['input']}</div>"
-                if "output" in step: html += f"<div style='font-size: 0.95em;'><strong>Output:</strong> {step['output']}</div>"
-                if "tools" in step:
-                    tools = step["tools"]
-                    if isinstance(tools, list): tools = ", ".join(tools)
-                    html += f"<div style='font-size: 0.95em; color: #0056b3;'><strong>Tools:</strong> {tools}</div>"
-                html += render_evidence(step)
-                html += "</div>"
-        if "tools" in d and isinstance(d["tools"], list):
-             html += f"<div style='margin-top: 12px;'><strong>Global Tools:</strong> {', '.join(d['tools'])}</div>"
-        html += render_evidence(d)
-        html += "</div>"
-        html_parts.append(html)
-
-    if "performance_summary" in data and data["performance_summary"]:
-        d = data["performance_summary"]
-        html = make_header("📊", "Performance")
-        html += "<div style='margin-left: 10px;'>"
-        if "performance_summary" in d: html += render_content(d["performance_summary"])
-        if "baselines" in d and d["baselines"]:
-             html += "<div style='margin-top: 8px;'><strong>Baselines:</strong></div>" + render_content(d["baselines"])
-        if "evaluation_metrics" in d and d["evaluation_metrics"]:
-             html += "<div style='margin-top: 8px;'><strong>Metrics:</strong></div>" + render_content(d["evaluation_metrics"])
-        html += render_evidence(d)
-        html += "</div>"
-        html_parts.append(html)
-
-    if "subject_area" in data and data["subject_area"]:
-        d = data["subject_area"]
-        html = make_header("📚", "Subject Area")
-        html += "<div style='margin-left: 10px;'>" + render_content(d.get("areas", [])) + render_evidence(d) + "</div>"
-        html_parts.append(html)
-
-    if "limitations" in data and data["limitations"]:
-        d = data["limitations"]
-        content_list = d.get("limitations", [])
-        if content_list:
-            html = make_header("⚠️", "Limitations")
-            html += "<div style='margin-left: 10px;'>" + render_content(content_list) + render_evidence(d) + "</div>"
-            html_parts.append(html)
-
-    if "future_directions" in data and data["future_directions"]:
-        d = data["future_directions"]
-        content_list = d.get("future_directions", [])
-        if content_list:
-            html = make_header("🔮", "Future Directions")
-            html += "<div style='margin-left: 10px;'>" + render_content(content_list) + render_evidence(d) + "</div>"
-            html_parts.append(html)
-
-    if "resource_link" in data and data["resource_link"]:
-        d = data["resource_link"]
-        url = d.get("answer", "")
-        if url and url.startswith("http"):
-            html = make_header("🔗", "Resource Link")
-            html += f"<div style='margin-left: 10px;'><a href='{url}' target='_blank' style='color:#0000EE; text-decoration:underline;'>{url}</a></div>"
-            html_parts.append(html)
-
-    if not html_parts:
-        return "<div style='color:#666; font-style:italic;'>No detailed summary data available.</div>"
-    
-    return "".join(html_parts)
+# Paper List: semantic search cut-offs
+SEMANTIC_RESULTS = 50
+MIN_SEMANTIC_SCORE = 0.1
 
+# Paper List: summaries and semantic results kept to answer the browser;
+# older ones are already cached there.
+PAPER_LIST_ANSWERS = 8
 
-# ---------------------------------------------------------
-# DATA LOADING
-# ---------------------------------------------------------
-def resolve_papers_directory(directory_name="Papers"):
-    cwd_directory = Path.cwd() / directory_name
-    base_directory = BASE_DIR / directory_name
-    for directory in (cwd_directory, base_directory):
-        if directory.exists() and directory.is_dir():
-            return directory
-    return base_directory
-
-def load_papers_from_directory(directory_name="Papers"):
-    papers = []
-    directory = resolve_papers_directory(directory_name)
-    
-    if not directory.exists():
-        return []
-
-    json_files = sorted(directory.rglob("*.json"))
-    
-    for file_path in json_files:
-        filename = file_path.name
-        try:
-            with file_path.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            raw_authors = data.get("authors", [])
-            authors_str = ", ".join(raw_authors) if isinstance(raw_authors, list) else str(raw_authors)
-            paper_link = data.get("link") or "#"
-            paper_link = paper_link if isinstance(paper_link, str) else str(paper_link)
-            
-            pub_date = str(data.get("published", ""))
-            year_match = re.search(r"\b(?:19|20)\d{2}\b", pub_date)
-            year_str = year_match.group(0) if year_match else "N/A"
-            
-            topics = []
-            subject_area = data.get("subject_area") or {}
-            raw_areas = subject_area.get("areas", []) if isinstance(subject_area, dict) else []
-            for area in raw_areas:
-                if isinstance(area, dict):
-                    topics.append(area.get("name", "Unknown"))
-                else:
-                    topics.append(str(area))
-            
-            papers.append({
-                "title": data.get("paper_title") or "Untitled Paper",
-                "authors": authors_str,
-                "year": year_str,
-                "venue": "arXiv" if "arxiv" in paper_link.lower() else "Scientific Publication",
-                "url": paper_link,
-                "topics": topics,
-                "filename": filename,
-                "full_data": data
-            })
-            
-        except Exception as e:
-            print(f"Error loading {filename}: {e}")
-            continue
-            
-    return papers
-
-PAPER_DATA = load_papers_from_directory("Papers")
+# Survey jobs: seconds between refreshes of a queued or running job
+SURVEY_JOB_POLL_INTERVAL = 1.0
 
-# ---------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------
-def read_file(path):
-    file_path = BASE_DIR / path
-    try:
-        return file_path.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        st.error(f"Could not find file: {path}")
-        return ""
+# Profiling panel (EXHYTE_PROFILE=1): log lines aggregated into p50/p95
+PROFILE_LOG_TAIL = 5000
 
-def load_image_as_base64(path):
-    file_path = BASE_DIR / path
-    try:
-        with file_path.open("rb") as f:
-            data = f.read()
-            return base64.b64encode(data).decode()
-    except FileNotFoundError:
-        return None
-
-def process_html_content(html_content, image_map):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    for link in soup.find_all("a", href=True):
-        if "wordtohtml.net" in link["href"]:
-            removable = link.find_parent("div") or link
-            removable.decompose()
-
-    for p in soup.find_all('p'):
-        if not p.get_text(strip=True) and p.find('br'):
-            p.decompose()
-
-    images = soup.find_all('img')
-    for img in images:
-        src = img.get('src', '')
-        is_data_uri = src.startswith("data:")
-        filename = src.split('/')[-1].split("?")[0] if '/' in src else src.split("?")[0]
-        if filename in image_map:
-            ext = filename.split('.')[-1].lower()
-            mime = "jpeg" if ext == "jpg" else ext
-            img['src'] = f"data:image/{mime};base64,{image_map[filename]}"
-        elif not is_data_uri:
-            placeholder = soup.new_tag("div")
-            placeholder["style"] = (
-                "border: 1px dashed #aaa; background: #f8f8f8; color: #555; "
-                "font-family: 'Times New Roman', serif; text-align: center; "
-                "padding: 32px 16px; margin: 16px auto; max-width: 640px;"
-            )
-            placeholder.string = f"Missing image file: {filename or 'unknown image'}"
-            img.replace_with(placeholder)
-            continue
-        existing_style = img.get('style', '')
-        img['style'] = "; ".join([
-            part for part in [existing_style, 'max-width: 100%; height: auto; display: block; margin: 0 auto;'] if part
-        ])
-    if soup.body and "exhyte-paper" in soup.body.get("class", []):
-        return str(soup)
-    style_tag = soup.new_tag("style")
-    style_tag.string = """
-        html, body {
-            background: #ffffff;
-            color: #111;
-        }
-        body, body.pdf-article, body.exhyte-paper {
-            box-sizing: border-box;
-            margin: 0 auto !important;
-            max-width: none !important;
-            width: 100% !important;
-            padding: 20px 24px 34px !important;
-            background: #ffffff;
-            color: #111;
-            font-family: "Times New Roman", serif;
-            font-size: 14pt !important;
-            line-height: 1.45 !important;
-        }
-        p, h1, h2, h3, h4, h5, li, div {
-            margin-top: 5px !important; margin-bottom: 5px !important;
-            padding-top: 0px !important; padding-bottom: 0px !important;
-            line-height: 1.45 !important;
-        }
-        h1 { font-size: 22pt !important; line-height: 1.22 !important; }
-        h2 { font-size: 18pt !important; line-height: 1.25 !important; }
-        h3 { font-size: 16pt !important; line-height: 1.28 !important; }
-        li { margin-left: 20px !important; }
-        figure { margin: 16px 0; }
-        img { max-width: 100%; height: auto; display: block; margin: 0 auto; }
-        figcaption { font-size: 14pt !important; line-height: 1.35 !important; text-align: justify; }
-        a { color: #0b57d0; text-decoration: underline; }
-    """
-    if soup.head: soup.head.append(style_tag)
-    else: soup.append(style_tag)
-    return str(soup)
+if profiling_enabled():
+    start_run()
 
 # ---------------------------------------------------------
-# Load Files
+# DATA LOADING
 # ---------------------------------------------------------
-FILES = {
-    "tab1_html": "EXHYTE_webpage (1).html",
-    "tab2_html": "EXHYTE_webpage (1)-1 (1).html",
-    "tab3_html": "EXHYTE_webpage (2) (1).html",
-}
-
-IMAGE_FILES = [
-    "image001.png",
-    "image001_t2.jpg",
-    "image002.jpg",
-    "image003.jpg",
-    "figure1.v10.png",
-    "figure_2_v4_062126.png",
-    "EXHYTE_stages_input_outputs_v4.png",
-    "figure4_ai_methods.png",
-]
-image_map = {}
-for img_name in IMAGE_FILES:
-    b64_data = load_image_as_base64(img_name)
-    if b64_data:
-        image_map[img_name] = b64_data
-    if b64_data and "image001.png" in img_name:
-         image_map["Image_001.png"] = b64_data
-
-html_tab1 = process_html_content(read_file(FILES["tab1_html"]), image_map)
-html_tab2 = process_html_content(read_file(FILES["tab2_html"]), image_map)
-html_tab3 = process_html_content(read_file(FILES["tab3_html"]), image_map)
+@st.cache_resource
+def get_startup_state(directory_name="Papers"):
+    # One set of corpora, indexes and summaries per server process, restored
+    # from the snapshot built with `python snapshot.py` when there is one
+    # (parsed from the JSON files otherwise). The snapshot itself is only a
+    # local here, so it is released once its state has been restored.
+    snapshot = load_snapshot() or {}
+    papers = PaperCorpus(directory_name)
+    if "papers" in snapshot:
+        papers.restore_state(snapshot["papers"])
+    # Reruns only re-stat the JSON files; a background watcher parses new or
+    # changed files between reruns.
+    papers.watch()
+    search_index = SearchIndex()
+    if "search_index" in snapshot:
+        search_index.restore_state(snapshot["search_index"])
+    annotations = annotation_corpus()
+    if "annotations" in snapshot:
+        annotations.restore_state(snapshot["annotations"])
+    # Opening a summary is a lookup once the background prerender has run;
+    # the store keeps a bounded number in memory and the rest on disk.
+    summaries = SummaryStore()
+    summaries.seed(snapshot.get("summaries", {}))
+    return {
+        "papers": papers,
+        "search_index": search_index,
+        "annotations": annotations,
+        "summaries": summaries,
+        # Rebuilt in the background when the papers change; a matching
+        # snapshot index is served as is.
+        "similarity": SimilarityCache(snapshot.get("similarity")),
+    }
+
+STARTUP_STATE = get_startup_state("Papers")
+
+PAPER_CORPUS = STARTUP_STATE["papers"]
+PAPER_DATA = PAPER_CORPUS.refresh()
+
+SEARCH_INDEX = STARTUP_STATE["search_index"]
+SEARCH_INDEX.sync(PAPER_DATA)
+
+# The previous index (None until the first build) while a rebuild runs.
+SIMILARITY = STARTUP_STATE["similarity"]
+SIMILARITY_INDEX = SIMILARITY.current(PAPER_DATA)
+PAPERS_BY_FILENAME = {p.get("filename"): p for p in PAPER_DATA}
+
+@st.cache_resource(max_entries=1)
+def get_annotation_matrix(annotation_version, paper_version, _annotations, _papers):
+    # Rebuilt only when the annotations or the papers they join to change.
+    return AnnotationMatrix(_annotations, _papers)
+
+ANNOTATION_CORPUS = STARTUP_STATE["annotations"]
+ANNOTATION_DATA = ANNOTATION_CORPUS.refresh()
+ANNOTATION_MATRIX = get_annotation_matrix(ANNOTATION_CORPUS.version, PAPER_CORPUS.version, ANNOTATION_DATA, PAPER_DATA)
+
+@st.cache_resource(max_entries=1)
+def get_facet_index(annotation_version, paper_version, _papers, _matrix):
+    # Topic/year/venue/substage bitmaps shared by the Paper List and the Survey Generator.
+    return FacetIndex(_papers, _matrix)
+
+FACET_INDEX = get_facet_index(ANNOTATION_CORPUS.version, PAPER_CORPUS.version, PAPER_DATA, ANNOTATION_MATRIX)
+
+@st.cache_resource
+def get_workflow_stats():
+    return WorkflowStats()
+
+# Aggregates are updated only for annotation files that changed.
+WORKFLOW_STATS = get_workflow_stats()
+WORKFLOW_STATS.sync(ANNOTATION_DATA)
+
+SUMMARY_STORE = STARTUP_STATE["summaries"]
+SUMMARY_STORE.prerender_in_background(PAPER_DATA)
+
+@st.cache_resource(max_entries=1)
+def get_paper_payloads(annotation_version, paper_version, similarity_version, static, _papers, _facet_index, _search_index, _similarity):
+    # The Paper List's data, sent to the browser once per corpus version:
+    # linked by content-hashed URL with static serving, inlined without.
+    with span("paper_list.payloads", papers=len(_papers), static=static):
+        papers = build_paper_payload(_papers, _facet_index, _similarity)
+        search = build_search_payload(_search_index, _papers)
+        version = f"{payload_digest(papers)}.{payload_digest(search)}"
+        if static:
+            return {"version": version, "papers_url": publish_payload("papers", papers), "search_url": publish_payload("search", search)}
+        return {"version": version, "papers": papers, "search": search}
 
 # ---------------------------------------------------------
 # CSS — Streamlit Tabs & UI Styling (GLOBAL FONTS)
@@ -457,13 +252,6 @@ html, body, [class*="css"], .stTextInput input, .stMultiSelect, .stButton button
     font-size: 14pt !important;
 }
 
-/* Paper List Numbering */
-.paper-number {
-    font-size: 14pt; font-weight: bold; color: #555; text-align: right;
-    padding-right: 10px; font-family: 'Times New Roman', serif;
-    white-space: nowrap !important; width: 100%;
-}
-
 /* Custom Font for Dropdown Options */
 div[data-baseweb="select"] > div {
     font-family: 'Times New Roman', serif !important;
@@ -542,129 +330,208 @@ gaos8@upmc.edu; yuc250@pitt.edu; leili@andrew.cmu.edu;
 # ---------------------------------------------------------
 # TABS & CONTENT
 # ---------------------------------------------------------
-tab_sec2, tab_sec34, tab_sec5, tab_papers, tab_survey = st.tabs([
+tab_sec2, tab_sec34, tab_sec5, tab_papers, tab_stats, tab_survey = st.tabs([
     "The EXHYTE Framework",
     "AI Methods for EXHYTE",
     "Tools & Datasets",
     "Paper List",
+    "Workflow Statistics",
     "Survey Generator"
-])
-
-with tab_sec2: st.iframe(html_tab1, height=1350)
-with tab_sec34: st.iframe(html_tab2, height=1350)
-with tab_sec5: st.iframe(html_tab3, height=1350)
+], key="active_tab", on_change="rerun")
+
+def render_exhyte_page(file_key):
+    # Pages are built once per content hash; images are linked, not inlined,
+    # when static serving is enabled (see .streamlit/config.toml). Until the
+    # image variants are encoded in the background the page shows the originals.
+    mode = "static" if st.get_option("server.enableStaticServing") else "inline"
+    html_page = build_page(FILES[file_key], mode, wait=False)
+    if html_page is None:
+        st.error(f"Could not find file: {FILES[file_key]}")
+        return
+    st.iframe(html_page, height=1350)
+
+# Only the selected tab is computed and sent to the browser.
+with tab_sec2:
+    if tab_sec2.open: render_exhyte_page("tab1_html")
+with tab_sec34:
+    if tab_sec34.open: render_exhyte_page("tab2_html")
+with tab_sec5:
+    if tab_sec5.open: render_exhyte_page("tab3_html")
 
 # --- TAB 4: PAPER LIST ---
-with tab_papers:
-    col_filter, col_list = st.columns([1, 4])
-
-    with col_filter:
-        st.markdown("### Filters")
-        all_topics = set()
-        for p in PAPER_DATA:
-            if "topics" in p: all_topics.update(p["topics"])
-        
-        selected_topics = st.multiselect("Search by Topic", options=sorted(list(all_topics)))
-        search_keyword = st.text_input("Search by Keyword", placeholder="e.g. Creativity...")
-
-    # Filter Logic
-    filtered_papers = []
-    clean_keyword = search_keyword.strip().lower() if search_keyword else ""
-    
-    if not selected_topics and not clean_keyword:
-        filtered_papers = PAPER_DATA 
-    else:
-        for p in PAPER_DATA:
-            topic_match = not selected_topics or any(t in p.get("topics", []) for t in selected_topics)
-            keyword_match = True
-            if clean_keyword:
-                full_text_search = str(p['full_data']).lower()
-                if clean_keyword not in full_text_search:
-                    keyword_match = False
-            if topic_match and keyword_match:
-                filtered_papers.append(p)
-
-    with col_list:
-        st.markdown(f"### References & Papers ({len(filtered_papers)})")
-        st.markdown("---")
-        
-        if not filtered_papers:
-            if not PAPER_DATA: st.warning("No JSON files found in 'Papers' folder.")
-            else: st.info("No papers found matching criteria.")
-
-        with st.container(height=1000, border=False):
-            for idx, paper in enumerate(filtered_papers):
-                with st.container():
-                    paper_id = re.sub(r"[^A-Za-z0-9_-]+", "_", paper.get("filename", str(idx)))
-                    summary_key = f"show_summary_{paper_id}"
-                    c_num, c_content, c_btns = st.columns([1, 14, 3])
-                    
-                    with c_num:
-                        st.markdown(f"<div class='paper-number'>{idx + 1}</div>", unsafe_allow_html=True)
-                    
-                    with c_content:
-                        title_html = html_lib.escape(paper['title'], quote=True)
-                        authors_html = html_lib.escape(paper['authors'], quote=True)
-                        venue_html = html_lib.escape(paper['venue'], quote=True)
-                        year_html = html_lib.escape(str(paper['year']), quote=True)
-                        content_html = f"""
-                        <div style="font-family: 'Times New Roman', serif;">
-                            <div style="font-size: 14pt; font-weight: bold; color: #000;">{title_html}</div>
-                            <div style="font-size: 14pt; color: #333; font-style: italic;">{authors_html} ({year_html})</div>
-                            <div style="font-size: 14pt; color: #666;">{venue_html}</div>
-                        </div>
-                        """
-                        st.markdown(content_html, unsafe_allow_html=True)
-
-                    with c_btns:
-                        b1, b2 = st.columns([1, 1])
-                        with b1:
-                            if st.button("📄", key=f"sum_btn_{paper_id}", help="View Summary"):
-                                st.session_state[summary_key] = not st.session_state.get(summary_key, False)
-                        with b2:
-                            url = paper.get("url", "")
-                            if isinstance(url, str) and url.startswith(("http://", "https://")):
-                                st.link_button("🔗", url, help="Go to Source")
-                            else:
-                                st.button("🔗", key=f"link_btn_{paper_id}", help="No source link available", disabled=True)
-
-                    if st.session_state.get(summary_key, False):
-                        rich_summary_html = generate_summary_html(paper['full_data'])
-                        
-                        st.markdown(f"""
-                        <div style="
-                            background-color: #fcfcfc; 
-                            border: 1px solid #ddd;
-                            border-left: 5px solid #888; 
-                            padding: 15px; 
-                            margin-top: 10px; 
-                            margin-bottom: 15px; 
-                            font-family: 'Times New Roman', serif; 
-                            color: #000;
-                            line-height: 1.5;">
-                            {rich_summary_html}
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    st.markdown("<hr style='margin-top: 5px; margin-bottom: 5px; border-top: 1px solid #eee;'>", unsafe_allow_html=True)
-
-# --- TAB 5: SURVEY GENERATOR ---
-with tab_survey:
-    # SURVEY PROMPT TEMPLATE
-    survey_prompt_template = """
-    I want you to write a scientific survey that summarizes the provided JSON papers.
-    
-    The survey should have the following sections:
-    1. **Introduction**: Overview of the research themes.
-    2. **Methodological Approaches**: Synthesize the methods (e.g. tools, frameworks).
-    3. **Key Innovations**: Highlight novelty across papers.
-    4. **Limitations & Gaps**: Discuss common limitations or knowledge gaps.
-    5. **Future Directions**: Suggest future research paths based on the papers.
-    
-    Output the survey in well-formatted Markdown.
-    Use academic tone.
-    """
+def remember(answers, key, value):
+    answers.pop(key, None)
+    answers[key] = value
+    while len(answers) > PAPER_LIST_ANSWERS:
+        answers.pop(next(iter(answers)))
+
+def on_paper_summary():
+    filename = st.session_state.paper_browser.get("summary")
+    paper = PAPERS_BY_FILENAME.get(filename)
+    with span("paper_list.summary", found=paper is not None):
+        summary = SUMMARY_STORE.get(paper) if paper else "<em>This paper is no longer in the list.</em>"
+    remember(st.session_state.paper_summaries, filename, summary)
+
+def on_paper_semantic():
+    query = st.session_state.paper_browser.get("semantic") or ""
+    with span("paper_list.semantic") as timing:
+        filenames = [
+            key for key, score in SIMILARITY_INDEX.search(query.strip(), k=SEMANTIC_RESULTS)
+            if score >= MIN_SEMANTIC_SCORE and key in PAPERS_BY_FILENAME
+        ] if query.strip() and SIMILARITY_INDEX is not None else []
+        timing["results"] = len(filenames)
+    remember(st.session_state.paper_semantic_results, query, filenames)
+
+def on_paper_survey_selection():
+    filenames = st.session_state.paper_browser.get("survey_selection") or []
+    st.session_state.survey_selected_titles = [
+        PAPERS_BY_FILENAME[key]["title"] for key in filenames if key in PAPERS_BY_FILENAME
+    ]
+
+# Fragments: widgets inside a section rerun only that section. Filtering,
+# search and paging run in the browser and do not rerun anything.
+@st.fragment
+def render_paper_list():
+    st.session_state.setdefault("paper_summaries", {})
+    st.session_state.setdefault("paper_semantic_results", {})
+    payloads = get_paper_payloads(
+        ANNOTATION_CORPUS.version, PAPER_CORPUS.version, SIMILARITY.version, bool(st.get_option("server.enableStaticServing")),
+        PAPER_DATA, FACET_INDEX, SEARCH_INDEX, SIMILARITY_INDEX
+    )
+    selected_titles = set(st.session_state.get("survey_selected_titles", []))
+
+    if not PAPER_DATA:
+        st.warning("No JSON files found in 'Papers' folder.")
+    ingest_errors = PAPER_CORPUS.errors() + SUMMARY_STORE.errors()
+    if ingest_errors:
+        with st.expander(f"⚠️ {len(ingest_errors)} file(s) could not be loaded or summarized"):
+            for entry in ingest_errors:
+                st.caption(f"**{Path(entry['path']).name}** — {entry['error']}")
+
+    paper_browser(
+        payloads,
+        summaries=st.session_state.paper_summaries,
+        # "Match by meaning" is hidden until the first similarity index is built.
+        semantic=st.session_state.paper_semantic_results if SIMILARITY_INDEX is not None else None,
+        survey_selection=[p.get("filename") for p in PAPER_DATA if p.get("title") in selected_titles],
+        key="paper_browser",
+        on_summary=on_paper_summary,
+        on_semantic=on_paper_semantic,
+        on_survey_selection=on_paper_survey_selection,
+    )
+
+# --- TAB 5: WORKFLOW STATISTICS ---
+@st.fragment
+def render_workflow_stats():
+    st.markdown("### EXHYTE Workflow Statistics")
+    st.markdown(
+        f"Aggregated over {WORKFLOW_STATS.n_papers} annotated papers. "
+        "The Test stage is split into design, execution and refinement."
+    )
+    st.markdown("---")
+
+    if not WORKFLOW_STATS.n_papers:
+        st.warning("No annotation files found in 'exhyte_data' folder.")
+        return
+
+    col_steps, col_transitions = st.columns(2)
+
+    with col_steps:
+        st.markdown("**Papers performing each workflow step**")
+        step_counts = WORKFLOW_STATS.step_counts().reset_index()
+        st.altair_chart(
+            alt.Chart(step_counts).mark_bar().encode(
+                x=alt.X("share:Q", title="Share of papers", axis=alt.Axis(format="%")),
+                y=alt.Y("step:N", sort=STEP_NAMES, title=None),
+                tooltip=["step", "papers", alt.Tooltip("share:Q", format=".0%")],
+            ),
+            width="stretch"
+        )
+
+    with col_transitions:
+        st.markdown("**Direct step-to-step transitions**")
+        transitions = WORKFLOW_STATS.transitions()
+        st.altair_chart(
+            alt.Chart(transitions).mark_rect().encode(
+                x=alt.X("to:N", sort=STEP_NAMES, title="To"),
+                y=alt.Y("from:N", sort=STEP_NAMES, title="From"),
+                color=alt.Color("papers:Q", title="Papers"),
+                tooltip=["from", "to", "papers"],
+            ),
+            width="stretch"
+        )
 
+    st.markdown("**Share of papers performing each step, by publication year**")
+    trends = WORKFLOW_STATS.yearly_trends()
+    st.line_chart(trends.drop(columns="papers"))
+    st.caption("Papers per year: " + ", ".join(f"{year}: {n}" for year, n in trends["papers"].items()))
+
+    st.markdown("**Substage co-occurrence**")
+    min_count = st.slider(
+        "Only substages performed by at least this many papers:",
+        min_value=1,
+        max_value=max(1, WORKFLOW_STATS.n_papers),
+        value=min(5, max(1, WORKFLOW_STATS.n_papers))
+    )
+    cooccurrence = WORKFLOW_STATS.substage_cooccurrence(min_count=min_count)
+    labels = [substage for _, substage in cooccurrence.index]
+    cooccurrence_long = pd.DataFrame(cooccurrence.to_numpy(), index=labels, columns=labels).rename_axis("a").reset_index().melt(
+        id_vars="a", var_name="b", value_name="papers"
+    )
+    st.altair_chart(
+        alt.Chart(cooccurrence_long).mark_rect().encode(
+            x=alt.X("b:N", sort=labels, title=None, axis=alt.Axis(labelLimit=220)),
+            y=alt.Y("a:N", sort=labels, title=None, axis=alt.Axis(labelLimit=320)),
+            color=alt.Color("papers:Q", title="Papers"),
+            tooltip=[alt.Tooltip("a:N", title="Substage"), alt.Tooltip("b:N", title="With"), "papers"],
+        ).properties(height=max(300, 14 * len(labels))),
+        width="stretch"
+    )
+
+# --- TAB 6: SURVEY GENERATOR ---
+def get_api_base_url():
+    # An OpenAI-compatible server (e.g. a self-hosted model) is a deployment
+    # setting: OPENAI_BASE_URL in .streamlit/secrets.toml or the environment.
+    # Visitors cannot choose it, so they cannot make the server call other hosts.
+    try:
+        base_url = st.secrets.get("OPENAI_BASE_URL")
+    except FileNotFoundError:
+        base_url = None
+    return (base_url or os.environ.get("OPENAI_BASE_URL", "")).strip()
+
+@st.cache_resource
+def get_survey_cache():
+    return SurveyCache()
+
+SURVEY_CACHE = get_survey_cache()
+
+@st.cache_resource
+def get_client_pool():
+    # One pooled, rate-limited client per API key and base URL for all sessions.
+    return ClientPool(
+        requests_per_minute=int(os.environ.get("OPENAI_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+        tokens_per_minute=int(os.environ.get("OPENAI_TPM", DEFAULT_TOKENS_PER_MINUTE)),
+    )
+
+CLIENT_POOL = get_client_pool()
+
+@st.cache_resource
+def get_survey_jobs():
+    # Worker and queue limits can be raised per deployment, e.g. SURVEY_JOB_WORKERS=4.
+    return SurveyJobQueue(
+        max_workers=int(os.environ.get("SURVEY_JOB_WORKERS", DEFAULT_MAX_WORKERS)),
+        max_queued=int(os.environ.get("SURVEY_JOB_QUEUE_DEPTH", DEFAULT_MAX_QUEUED)),
+    )
+
+SURVEY_JOBS = get_survey_jobs()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def pack_survey_selection(content_hashes, token_budget, _papers):
+    # Keyed on the papers' content hashes; the full JSON is only read on a miss.
+    return pack_survey_prompt([load_full_data(p) for p in _papers], token_budget)
+
+@st.fragment
+def render_survey_generator():
     st.markdown("### Scientific Survey Generator")
     st.markdown("Generate a structured, scientific-style survey from selected papers.")
     st.markdown("---")
@@ -684,18 +551,15 @@ with tab_survey:
             type="password",
             placeholder="sk-..."
         )
+        api_base_url = get_api_base_url()
 
         # 2. FILTER BY YEAR
         st.markdown("**2. Filter Papers by Year**")
-        # Extract all unique years
-        all_years = sorted(
-            {p['year'] for p in PAPER_DATA if re.fullmatch(r"(?:19|20)\d{2}", str(p['year']))},
-            key=int,
-            reverse=True
-        )
+        year_counts = FACET_INDEX.counts("year", {})
         selected_years = st.multiselect(
             "Select Publication Years:",
-            options=all_years,
+            options=FACET_INDEX.options("year"),
+            format_func=lambda year: f"{year} ({year_counts.get(year, 0)})",
             help="Filter the list of papers below by their publication year."
         )
 
@@ -703,13 +567,10 @@ with tab_survey:
         st.markdown("**3. Select Papers**")
 
         # Filter titles based on selected years
-        if selected_years:
-            filtered_paper_data = [p for p in PAPER_DATA if p['year'] in selected_years]
-        else:
-            filtered_paper_data = PAPER_DATA
+        filtered_paper_data = FACET_INDEX.select({"year": selected_years})
 
-        # Map Title -> Full Data
-        paper_map = {p['title']: p['full_data'] for p in filtered_paper_data}
+        # Map Title -> Paper
+        paper_map = {p['title']: p for p in filtered_paper_data}
         all_titles = sorted(list(paper_map.keys()))
 
         valid_selected_titles = [title for title in st.session_state.survey_selected_titles if title in paper_map]
@@ -729,47 +590,187 @@ with tab_survey:
         else:
             st.caption(f"{len(all_titles)} papers available for the current filter.")
 
-        # 4. GENERATE BUTTON
+        # 4. PROMPT SIZE
+        st.markdown("**4. Prompt Budget**")
+        token_budget = st.number_input(
+            "Maximum prompt tokens:",
+            min_value=2_000,
+            max_value=120_000,
+            value=DEFAULT_PROMPT_TOKEN_BUDGET,
+            step=5_000,
+            help="Evidence quotes, metadata and lower-priority sections are dropped until the selection fits."
+        )
+        survey_mode = st.radio(
+            "Survey mode:",
+            options=["Single request", "Map-reduce"],
+            horizontal=True,
+            help="Map-reduce summarizes batches of papers in parallel, then merges them. Use it for large selections."
+        )
+        if survey_mode == "Map-reduce":
+            c_batch, c_conc = st.columns(2)
+            with c_batch:
+                batch_size = st.number_input("Papers per batch:", min_value=1, max_value=50, value=DEFAULT_BATCH_SIZE)
+            with c_conc:
+                max_concurrency = st.number_input("Parallel requests:", min_value=1, max_value=16, value=DEFAULT_MAX_CONCURRENCY)
+
+        packed_prompt = None
+        if selected_titles and survey_mode == "Map-reduce":
+            n_batches = math.ceil(len(selected_titles) / batch_size)
+            st.caption(f"{n_batches} batch(es) of up to {batch_size} papers, {min(n_batches, max_concurrency)} at a time, then one merge request.")
+        elif selected_titles:
+            selected_papers = [paper_map[title] for title in selected_titles]
+            packed_prompt = pack_survey_selection(
+                tuple(p["content_hash"] for p in selected_papers),
+                token_budget,
+                selected_papers
+            )
+            cost = estimate_cost(packed_prompt["prompt_tokens"])
+            cost_text = f" · est. cost ≤ ${cost:.2f}" if cost is not None else ""
+            st.caption(f"Estimated prompt: {packed_prompt['prompt_tokens']:,} tokens{cost_text}")
+            if packed_prompt["dropped"]:
+                st.caption("Dropped to fit the budget: " + ", ".join(packed_prompt["dropped"]) + ".")
+            if packed_prompt["truncated"]:
+                st.caption("Long passages were shortened to fit the budget.")
+            if not packed_prompt["fits"]:
+                st.warning("This selection does not fit the prompt budget. Select fewer papers or raise the budget.")
+
+        # 5. GENERATE BUTTON
         st.markdown("<br>", unsafe_allow_html=True)
+        stream_output = st.toggle(
+            "Stream output",
+            value=True,
+            help="Show the survey as it is written. Stopping keeps the partial text."
+        )
         generate_clicked = st.button("🚀 Generate Survey Summary")
 
+        # Identical requests (same papers, templates, model and settings) reuse a stored survey.
+        survey_key = None
+        cached_survey = None
+        regenerate_clicked = False
+        if selected_titles:
+            survey_key = survey_cache_key(
+                [paper_map[title]["content_hash"] for title in selected_titles],
+                **survey_request_params(survey_mode, token_budget, batch_size if survey_mode == "Map-reduce" else None)
+            )
+            cached_survey = SURVEY_CACHE.get(survey_key)
+        if cached_survey:
+            generated_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(cached_survey["created_at"]))
+            st.caption(f"A cached survey for this selection is available (generated {generated_at}).")
+            regenerate_clicked = st.button("🔄 Regenerate", help="Ignore the cached survey and request a new one.")
+
     with col_right:
         st.markdown("**Survey Output**")
 
-        if generate_clicked:
+        # Surveys are generated by SURVEY_JOBS, off the script thread; the job
+        # id is kept in the URL so a reconnecting browser finds its result.
+        if generate_clicked and cached_survey:
+            st.session_state.survey_output = cached_survey["output"]
+            st.session_state.survey_job_id = None
+            st.query_params.pop("survey_job", None)
+            st.success("Loaded the cached survey for this selection.")
+        elif generate_clicked or regenerate_clicked:
             if not openai_api_key:
                 st.error("Please enter your OpenAI API key first.")
             elif not selected_titles:
                 st.warning("Please select at least one paper.")
+            elif survey_mode == "Single request" and not packed_prompt["fits"]:
+                st.error("The selected papers do not fit the prompt budget.")
             else:
+                job_kwargs = {}
+                if survey_mode == "Map-reduce":
+                    job_kwargs = {
+                        "json_objects": [load_full_data(paper_map[title]) for title in selected_titles],
+                        "batch_size": batch_size,
+                        "max_concurrency": max_concurrency,
+                        "token_budget": token_budget,
+                    }
+                else:
+                    job_kwargs = {"messages": packed_prompt["messages"]}
+                cache_meta = {"titles": selected_titles, "mode": survey_mode}
                 try:
-                    client = OpenAI(api_key=openai_api_key)
-                    json_objects = [paper_map[title] for title in selected_titles]
-                    user_content = f"Here are {len(json_objects)} JSON files representing selected papers:\n" + "\n\n".join(
-                        json.dumps(obj, indent=2) for obj in json_objects
+                    job_id = SURVEY_JOBS.submit(
+                        survey_job(
+                            CLIENT_POOL.get(openai_api_key, api_base_url or None),
+                            max_retries=0,
+                            stream=stream_output,
+                            cache=SURVEY_CACHE,
+                            cache_key=survey_key,
+                            cache_meta=cache_meta,
+                            **job_kwargs
+                        ),
+                        meta={**cache_meta, "stream": stream_output}
                     )
-
-                    messages = [
-                        {"role": "system", "content": "You are a helpful assistant for writing scientific surveys."},
-                        {"role": "user", "content": survey_prompt_template + "\n\n" + user_content},
-                    ]
-
-                    with st.spinner("Generating survey summary... this may take a minute ⏳"):
-                        response = client.chat.completions.create(
-                            model="gpt-4o",
-                            messages=messages,
-                            temperature=0.1,
-                            max_tokens=4000,
-                        )
-
-                    survey_text = response.choices[0].message.content.strip()
-                    st.session_state.survey_output = survey_text
-
-                    st.success("Survey Generated Successfully!")
-
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
-        if st.session_state.survey_output:
+                except QueueFull:
+                    st.error("Too many surveys are being generated right now. Please try again in a minute.")
+                else:
+                    st.session_state.survey_output = ""
+                    st.session_state.survey_job_id = job_id
+                    st.query_params["survey_job"] = job_id
+
+        if "survey_job_id" not in st.session_state:
+            st.session_state.survey_job_id = st.query_params.get("survey_job")
+        if st.session_state.survey_job_id:
+            job = SURVEY_JOBS.get(st.session_state.survey_job_id)
+            if job is None:
+                st.session_state.survey_job_id = None
+                st.warning("That survey job is no longer available.")
+            else:
+                # Poll while the job is active; the finished result needs no refresh.
+                active = job["status"] in SURVEY_JOB_ACTIVE_STATUSES
+                st.fragment(render_survey_job, run_every=SURVEY_JOB_POLL_INTERVAL if active else None)(job["id"], active)
+        elif st.session_state.survey_output:
             st.markdown(st.session_state.survey_output)
-        elif not generate_clicked:
+        else:
             st.info("Choose papers and click generate to create a survey.")
+
+def render_survey_job(job_id, polling):
+    job = SURVEY_JOBS.get(job_id)
+    status = job["status"]
+    if polling and status not in SURVEY_JOB_ACTIVE_STATUSES:
+        # Finished since the last poll: redraw once without the timer.
+        st.rerun(scope="app")
+
+    if status == "queued":
+        st.info(f"Waiting for a free worker (position {job.get('position', 1)} in the queue)...")
+    elif status == "running":
+        st.progress(min(job["progress"], 1.0), text=job["progress_text"] or "Generating survey...")
+    if status in SURVEY_JOB_ACTIVE_STATUSES:
+        st.button("⏹ Stop Generation", key="survey_stop", on_click=SURVEY_JOBS.cancel, args=(job_id,))
+    elif status == "done":
+        st.success("Survey Generated Successfully!")
+    elif status == "cancelled":
+        st.warning("Generation was stopped. The partial survey is shown below.")
+    elif status == "interrupted":
+        st.warning("This survey was interrupted by a server restart. The partial survey is shown below; generate it again for the full text.")
+    elif status == "error":
+        st.error(f"An error occurred: {job['error']}")
+
+    if job["output"]:
+        st.markdown(job["output"] + (" ▌" if status == "running" else ""))
+    elif status == "running" and not job["meta"].get("stream", True):
+        st.caption("The survey will appear here when it is complete.")
+
+with tab_papers:
+    if tab_papers.open: render_paper_list()
+with tab_stats:
+    if tab_stats.open: render_workflow_stats()
+with tab_survey:
+    if tab_survey.open: render_survey_generator()
+
+# --- PROFILING PANEL ---
+def render_profiling_panel(run):
+    with st.sidebar.expander("⏱️ Profiling", expanded=True):
+        st.caption(
+            f"Last full rerun: {run['spans'][-1]['seconds'] * 1000:.0f} ms. "
+            "Fragment reruns and background work are in the log summary below."
+        )
+        spans = pd.DataFrame(run["spans"]).drop(columns=["ts", "run"], errors="ignore")
+        spans.insert(1, "ms", (spans.pop("seconds") * 1000).round(2))
+        st.dataframe(spans, hide_index=True, width="stretch")
+        st.markdown(f"**Last {PROFILE_LOG_TAIL} logged spans**")
+        st.dataframe(pd.DataFrame(summarize(read_log(limit=PROFILE_LOG_TAIL))), hide_index=True, width="stretch")
+
+if profiling_enabled():
+    profile_run = finish_run(tab=st.session_state.get("active_tab"))
+    if profile_run is not None:
+        render_profiling_panel(profile_run)
@@ -0,0 +1,281 @@
+import html as html_lib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from corpus import load_full_data
+from profiling import span
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Prerendered summaries, one file per paper content hash.
+CACHE_DIR = BASE_DIR / ".cache" / "summaries"
+
+# Bump when generate_summary_html changes so stale prerendered files are ignored.
+RENDERER_VERSION = "1"
+
+# Summaries kept in memory; the rest are read back from CACHE_DIR.
+MEMO_SIZE = 256
+
+
+# ---------------------------------------------------------
+# HELPER: GENERATE STRUCTURED SUMMARY HTML
+# ---------------------------------------------------------
+def make_header(emoji, text):
+    return f"<div style='margin-top: 18px; margin-bottom: 8px; font-weight: bold; font-size: 1.1em; border-bottom: 1px solid #ddd; padding-bottom: 4px; color: #000; font-family: \"Times New Roman\", serif;'>{emoji} {text}</div>"
+
+
+def render_evidence(data_dict_or_str):
+    if isinstance(data_dict_or_str, dict) and "evidence" in data_dict_or_str and data_dict_or_str["evidence"]:
+        ev = data_dict_or_str["evidence"]
+        if isinstance(ev, list):
+            ev_text = "<br>• ".join(ev)
+            if len(ev) > 0: ev_text = "• " + ev_text
+        else:
+            ev_text = str(ev)
+        return f"<div style='margin-top: 4px; font-size: 0.9em; color: #555; background-color: #f4f4f4; padding: 6px; border-radius: 4px;'><em>📌 Evidence: {ev_text}</em></div>"
+    return ""
+
+
+def render_content(content):
+    # CASE 1: List of items
+    if isinstance(content, list):
+        parts = ["<ul>"]
+        for item in content:
+            parts.append("<li style='margin-bottom:8px;'>")
+            if isinstance(item, dict):
+                label = item.get("label") or item.get("name") or item.get("step") or ""
+                desc = item.get("explanation") or item.get("description") or item.get("answer") or ""
+
+                text_part = ""
+                if label:
+                    text_part = f"<strong>{html_lib.escape(str(label))}</strong>"
+                    if desc: text_part += f": {html_lib.escape(str(desc))}"
+                elif desc:
+                    text_part = f"{html_lib.escape(str(desc))}"
+
+                parts.append(f"<div>{text_part}</div>")
+                parts.append(render_evidence(item))
+            else:
+                parts.append(f"{html_lib.escape(str(item))}")
+            parts.append("</li>")
+        parts.append("</ul>")
+        return "".join(parts)
+    # CASE 2: Single String
+    elif isinstance(content, str):
+        return f"<div>{html_lib.escape(content)}</div>"
+    return ""
+
+
+def format_tools(tools):
+    # Tools are either plain names or {"name": ..., "description": ...} objects.
+    if not isinstance(tools, list):
+        return tools
+    return ", ".join(
+        str(tool.get("name") or tool.get("label") or "") if isinstance(tool, dict) else str(tool)
+        for tool in tools
+    )
+
+
+def render_section(emoji, title, content, evidence_source):
+    return (
+        make_header(emoji, title)
+        + "<div style='margin-left: 10px;'>" + render_content(content) + render_evidence(evidence_source) + "</div>"
+    )
+
+
+def render_method(d):
+    parts = [make_header("⚙️", "Method"), "<div style='margin-left: 10px;'>"]
+    if "steps" in d and isinstance(d["steps"], list):
+        for step in d["steps"]:
+            step_name = step.get("step", "Step")
+            parts.append(f"<div style='margin-top: 10px; background-color: #fff; border: 1px solid #e0e0e0; padding: 10px; border-radius: 5px; box-shadow: 0 1px 2px rgba(0,0,0,0.05);'>")
+            parts.append(f"<div style='font-weight: bold; color: #333; margin-bottom: 4px;'>{step_name}</div>")
+            if "input" in step: parts.append(f"<div style='font-size: 0.95em;'><strong>Input:</strong> {step['input']}</div>")
+            if "output" in step: parts.append(f"<div style='font-size: 0.95em;'><strong>Output:</strong> {step['output']}</div>")
+            if "tools" in step:
+                parts.append(f"<div style='font-size: 0.95em; color: #0056b3;'><strong>Tools:</strong> {format_tools(step['tools'])}</div>")
+            parts.append(render_evidence(step))
+            parts.append("</div>")
+    if "tools" in d and isinstance(d["tools"], list):
+        parts.append(f"<div style='margin-top: 12px;'><strong>Global Tools:</strong> {format_tools(d['tools'])}</div>")
+    parts.append(render_evidence(d))
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def render_performance(d):
+    parts = [make_header("📊", "Performance"), "<div style='margin-left: 10px;'>"]
+    if "performance_summary" in d: parts.append(render_content(d["performance_summary"]))
+    if "baselines" in d and d["baselines"]:
+        parts.append("<div style='margin-top: 8px;'><strong>Baselines:</strong></div>" + render_content(d["baselines"]))
+    if "evaluation_metrics" in d and d["evaluation_metrics"]:
+        parts.append("<div style='margin-top: 8px;'><strong>Metrics:</strong></div>" + render_content(d["evaluation_metrics"]))
+    parts.append(render_evidence(d))
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def generate_summary_html(data):
+    """
+    Parses JSON with ROBUST handling for lists of dictionaries.
+    """
+    html_parts = []
+
+    # SECTIONS
+    if "objective" in data and data["objective"]:
+        d = data["objective"]
+        html_parts.append(render_section("🎯", "Objective", d.get("answer", ""), d))
+
+    if "knowledge_gap" in data and data["knowledge_gap"]:
+        d = data["knowledge_gap"]
+        html_parts.append(render_section("🧩", "Knowledge Gap", d.get("answer", ""), d))
+
+    if "novelty" in data and data["novelty"]:
+        d = data["novelty"]
+        html_parts.append(render_section("✨", "Novelty", d.get("answer", ""), d))
+
+    if "inspirational_papers" in data and data["inspirational_papers"]:
+        d = data["inspirational_papers"]
+        html_parts.append(render_section("💡", "Inspirational Papers", d.get("answer", ""), d))
+
+    if "method" in data and data["method"]:
+        html_parts.append(render_method(data["method"]))
+
+    if "performance_summary" in data and data["performance_summary"]:
+        html_parts.append(render_performance(data["performance_summary"]))
+
+    if "subject_area" in data and data["subject_area"]:
+        d = data["subject_area"]
+        html_parts.append(render_section("📚", "Subject Area", d.get("areas", []), d))
+
+    if "limitations" in data and data["limitations"]:
+        d = data["limitations"]
+        content_list = d.get("limitations", [])
+        if content_list:
+            html_parts.append(render_section("⚠️", "Limitations", content_list, d))
+
+    if "future_directions" in data and data["future_directions"]:
+        d = data["future_directions"]
+        content_list = d.get("future_directions", [])
+        if content_list:
+            html_parts.append(render_section("🔮", "Future Directions", content_list, d))
+
+    if "resource_link" in data and data["resource_link"]:
+        d = data["resource_link"]
+        url = d.get("answer", "")
+        if url and url.startswith("http"):
+            html_parts.append(
+                make_header("🔗", "Resource Link")
+                + f"<div style='margin-left: 10px;'><a href='{url}' target='_blank' style='color:#0000EE; text-decoration:underline;'>{url}</a></div>"
+            )
+
+    if not html_parts:
+        return "<div style='color:#666; font-style:italic;'>No detailed summary data available.</div>"
+
+    return "".join(html_parts)
+
+
+# ---------------------------------------------------------
+# SUMMARY STORE
+# ---------------------------------------------------------
+def render_summary(paper, cache=True):
+    with span("summary.render", paper=paper.get("filename")) as timing:
+        summary_html = generate_summary_html(load_full_data(paper, cache=cache))
+        timing["bytes"] = len(summary_html)
+    return summary_html
+
+
+class SummaryStore:
+    """
+    Summary HTML rendered once per paper content hash. Rendered summaries are
+    written to CACHE_DIR, so they survive restarts and can be prerendered
+    ahead of time; the most recently used `memo_size` are kept in memory.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, memo_size=MEMO_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._prerendered = None
+        self._worker = None
+        self._errors = {}
+
+    def _path(self, content_hash):
+        return self.cache_dir / f"{RENDERER_VERSION}-{content_hash}.html"
+
+    def get(self, paper):
+        """Summary HTML for a paper record (as built by corpus.parse_paper)."""
+        content_hash = paper.get("content_hash")
+        if not content_hash:
+            return render_summary(paper)
+        with self._lock:
+            cached = self._memo.get(content_hash)
+            if cached is not None:
+                self._memo.move_to_end(content_hash)
+                return cached
+
+        path = self._path(content_hash)
+        try:
+            summary_html = path.read_text(encoding="utf-8")
+        except OSError:
+            # Prerendering touches every paper; keep it out of the LRU.
+            summary_html = render_summary(paper, cache=False)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(summary_html, encoding="utf-8")
+            tmp.replace(path)
+        self._remember(content_hash, summary_html)
+        return summary_html
+
+    def _remember(self, content_hash, summary_html):
+        with self._lock:
+            self._memo[content_hash] = summary_html
+            self._memo.move_to_end(content_hash)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def export(self, papers):
+        """{content_hash: summary HTML} for `papers`, rendering any that are missing."""
+        return {paper["content_hash"]: self.get(paper) for paper in papers if paper.get("content_hash")}
+
+    def seed(self, summaries):
+        """Load summaries rendered elsewhere, e.g. from a snapshot (up to memo_size of them)."""
+        for content_hash, summary_html in list(summaries.items())[-self.memo_size:]:
+            self._remember(content_hash, summary_html)
+
+    def errors(self):
+        """{"path", "error"} for each paper whose summary failed to prerender."""
+        with self._lock:
+            return list(self._errors.values())
+
+    def prerender(self, papers):
+        errors = {}
+        for paper in papers:
+            try:
+                self.get(paper)
+            except Exception as e:
+                logger.exception("Rendering the summary of %s failed", paper.get("filename"))
+                errors[paper.get("content_hash") or paper.get("path")] = {
+                    "path": paper.get("path", paper.get("filename", "")),
+                    "status": "error",
+                    "error": f"Summary failed: {type(e).__name__}: {e}",
+                }
+        # Replaced as a whole, so papers fixed or removed since the last pass drop out.
+        with self._lock:
+            self._errors = errors
+
+    def prerender_in_background(self, papers):
+        """Render every summary in `papers` on a daemon thread, once per paper list."""
+        with self._lock:
+            if self._prerendered is papers:
+                return
+            self._prerendered = papers
+            worker = threading.Thread(target=self.prerender, args=(papers,), daemon=True)
+            self._worker = worker
+        worker.start()
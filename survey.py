@@ -0,0 +1,401 @@
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+
+from profiling import span
+from search_index import iter_strings
+
+try:
+    import tiktoken
+except ImportError:  # optional: falls back to a character-based estimate
+    tiktoken = None
+
+# ---------------------------------------------------------
+# SURVEY PROMPT
+# ---------------------------------------------------------
+survey_prompt_template = """
+    I want you to write a scientific survey that summarizes the provided JSON papers.
+    
+    The survey should have the following sections:
+    1. **Introduction**: Overview of the research themes.
+    2. **Methodological Approaches**: Synthesize the methods (e.g. tools, frameworks).
+    3. **Key Innovations**: Highlight novelty across papers.
+    4. **Limitations & Gaps**: Discuss common limitations or knowledge gaps.
+    5. **Future Directions**: Suggest future research paths based on the papers.
+    
+    Output the survey in well-formatted Markdown.
+    Use academic tone.
+    """
+
+SURVEY_SYSTEM_PROMPT = "You are a helpful assistant for writing scientific surveys."
+SURVEY_MODEL = "gpt-4o"
+SURVEY_TEMPERATURE = 0.1
+SURVEY_MAX_TOKENS = 4000
+
+
+def build_survey_messages(json_objects, template=survey_prompt_template, compact=False):
+    if compact:
+        serialized = (json.dumps(obj, separators=(",", ":"), ensure_ascii=False) for obj in json_objects)
+    else:
+        serialized = (json.dumps(obj, indent=2) for obj in json_objects)
+    user_content = f"Here are {len(json_objects)} JSON files representing selected papers:\n" + "\n\n".join(serialized)
+    return [
+        {"role": "system", "content": SURVEY_SYSTEM_PROMPT},
+        {"role": "user", "content": template + "\n\n" + user_content},
+    ]
+
+
+# ---------------------------------------------------------
+# PROMPT PACKING
+# ---------------------------------------------------------
+# gpt-4o has a 128k context; leave room for the answer and some slack.
+DEFAULT_PROMPT_TOKEN_BUDGET = 100_000
+
+# USD per 1M tokens as (input, output), used for the pre-send estimate.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Summary sections the survey is written from; any other key in a paper JSON
+# is ingestion metadata (scores, PDF paths, download status, ...).
+SURVEY_FIELDS = [
+    "paper_title", "authors", "published", "objective", "knowledge_gap", "novelty",
+    "inspirational_papers", "method", "performance_summary", "subject_area",
+    "limitations", "future_directions", "resource_link",
+]
+
+# What gets dropped, in order, until the prompt fits the budget. "evidence"
+# removes every evidence quote, "metadata" every key outside SURVEY_FIELDS;
+# anything else names a top-level section.
+PACKING_DROP_ORDER = [
+    ("evidence", "evidence quotes"),
+    ("metadata", "ingestion metadata"),
+    ("resource_link", "resource links"),
+    ("inspirational_papers", "inspirational papers"),
+    ("performance_summary", "performance details"),
+    ("future_directions", "future directions"),
+]
+
+# Shortest a string may be cut to when dropping sections is not enough.
+MIN_TRUNCATED_CHARS = 80
+
+_encoding = None
+
+
+def count_tokens(text, model=SURVEY_MODEL):
+    """Token count with tiktoken when installed, otherwise ~4 characters per token."""
+    global _encoding
+    if tiktoken is None:
+        return math.ceil(len(text) / 4)
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model=SURVEY_MODEL):
+    # A few tokens of chat framing per message.
+    return sum(count_tokens(m["content"], model) + 4 for m in messages) + 3
+
+
+def estimate_cost(prompt_tokens, model=SURVEY_MODEL, max_tokens=SURVEY_MAX_TOKENS):
+    """Upper-bound USD cost of one call, or None for a model without a price."""
+    if model not in MODEL_PRICES:
+        return None
+    input_price, output_price = MODEL_PRICES[model]
+    return (prompt_tokens * input_price + max_tokens * output_price) / 1_000_000
+
+
+def without_key(value, key):
+    """Copy of `value` with `key` removed from every nested dict."""
+    if isinstance(value, dict):
+        return {k: without_key(v, key) for k, v in value.items() if k != key}
+    if isinstance(value, list):
+        return [without_key(v, key) for v in value]
+    return value
+
+
+def truncate_strings(value, max_chars):
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars].rstrip() + "…"
+    if isinstance(value, dict):
+        return {k: truncate_strings(v, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        return [truncate_strings(v, max_chars) for v in value]
+    return value
+
+
+def drop_stage(obj, stage):
+    if stage == "evidence":
+        return without_key(obj, "evidence")
+    if stage == "metadata":
+        return {k: v for k, v in obj.items() if k in SURVEY_FIELDS}
+    return {k: v for k, v in obj.items() if k != stage}
+
+
+def pack_survey_prompt(
+    json_objects,
+    token_budget=DEFAULT_PROMPT_TOKEN_BUDGET,
+    drop_order=PACKING_DROP_ORDER,
+    template=survey_prompt_template,
+    model=SURVEY_MODEL,
+):
+    """
+    Serialize the selected papers compactly and shed low-value content until
+    the prompt fits `token_budget`: first each stage of `drop_order`, then
+    progressively shorter strings. The paper objects are not modified.
+
+    Returns a dict with the messages, their token count, the labels of what
+    was dropped, whether strings were truncated and whether the result fits.
+    """
+    objects = list(json_objects)
+    with span("survey.pack_prompt", papers=len(objects), token_budget=token_budget) as timing:
+        dropped = []
+
+        def measure(objs):
+            messages = build_survey_messages(objs, template, compact=True)
+            return messages, count_message_tokens(messages, model)
+
+        messages, tokens = measure(objects)
+        for stage, label in drop_order:
+            if tokens <= token_budget:
+                break
+            objects = [drop_stage(obj, stage) for obj in objects]
+            dropped.append(label)
+            messages, tokens = measure(objects)
+
+        truncated = False
+        if tokens > token_budget:
+            # Cap every string; halve the cap until the prompt fits.
+            longest = max((len(s) for obj in objects for s in iter_strings(obj)), default=0)
+            max_chars = longest // 2
+            while tokens > token_budget and max_chars >= MIN_TRUNCATED_CHARS:
+                messages, tokens = measure([truncate_strings(obj, max_chars) for obj in objects])
+                truncated = True
+                max_chars //= 2
+        timing["prompt_tokens"] = tokens
+        timing["dropped"] = len(dropped)
+
+    return {
+        "messages": messages,
+        "prompt_tokens": tokens,
+        "dropped": dropped,
+        "truncated": truncated,
+        "fits": tokens <= token_budget,
+    }
+
+
+# ---------------------------------------------------------
+# GENERATION
+# ---------------------------------------------------------
+def message_chars(messages):
+    return sum(len(message["content"]) for message in messages)
+
+
+_usage_lock = threading.Lock()
+
+
+def add_usage(usage, response):
+    """Add a response's reported token usage to the `usage` totals (a dict)."""
+    counts = getattr(response, "usage", None)
+    if usage is None or counts is None:
+        return
+    with _usage_lock:
+        usage["requests"] = usage.get("requests", 0) + 1
+        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (counts.prompt_tokens or 0)
+        usage["completion_tokens"] = usage.get("completion_tokens", 0) + (counts.completion_tokens or 0)
+
+
+def generate_survey(client, messages, model=SURVEY_MODEL, temperature=SURVEY_TEMPERATURE, max_tokens=SURVEY_MAX_TOKENS, usage=None):
+    with span("survey.api_call", model=model, prompt_chars=message_chars(messages)) as timing:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        content = response.choices[0].message.content.strip()
+        timing["output_chars"] = len(content)
+    add_usage(usage, response)
+    return content
+
+
+def stream_survey(client, messages, model=SURVEY_MODEL, temperature=SURVEY_TEMPERATURE, max_tokens=SURVEY_MAX_TOKENS):
+    """
+    Yield the survey text as it arrives. Closing the generator (or leaving
+    the loop early) closes the HTTP stream, which cancels the generation.
+    """
+    with span("survey.api_stream", model=model, prompt_chars=message_chars(messages)) as timing:
+        started = time.perf_counter()
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        output_chars = 0
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not output_chars:
+                        timing["first_token_seconds"] = round(time.perf_counter() - started, 3)
+                    output_chars += len(delta)
+                    yield delta
+        finally:
+            stream.close()
+            timing["output_chars"] = output_chars
+
+
+# ---------------------------------------------------------
+# MAP-REDUCE SURVEYS
+# ---------------------------------------------------------
+# Large selections are split into batches. Each batch gets a partial synthesis
+# organised by the survey sections (map), and the partials are merged into the
+# final survey with survey_prompt_template (reduce).
+map_prompt_template = """
+    I want you to write a partial synthesis of the provided JSON papers. It will later be merged
+    with partial syntheses of other papers into one scientific survey.
+
+    Organise your notes under these headings:
+    1. **Introduction**: Research themes of these papers.
+    2. **Methodological Approaches**: Methods, tools and frameworks used.
+    3. **Key Innovations**: What is novel in each paper.
+    4. **Limitations & Gaps**: Limitations and knowledge gaps.
+    5. **Future Directions**: Future research paths the papers suggest.
+
+    Name the papers you refer to. Be concise and factual; output Markdown.
+    """
+
+reduce_prompt_intro = "Here are {count} partial syntheses, each covering a different batch of the selected papers:\n"
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_CONCURRENCY = 4
+MAP_MAX_TOKENS = 1500
+
+# Retries for transient API failures: attempts after the first, and the base
+# delay (seconds) for exponential backoff with full jitter.
+DEFAULT_MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def retry_after_seconds(error):
+    """The server's Retry-After hint for a failed request, in seconds, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def call_with_retry(fn, max_retries=DEFAULT_MAX_RETRIES, base_delay=RETRY_BASE_DELAY):
+    """
+    Call fn(), retrying rate-limit, server and connection errors with jittered
+    backoff. A Retry-After header from the server sets the minimum wait.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, base_delay * 2 ** attempt)
+            time.sleep(max(delay, retry_after_seconds(e) or 0.0))
+
+
+def survey_batches(json_objects, batch_size=DEFAULT_BATCH_SIZE):
+    objects = list(json_objects)
+    return [objects[i:i + batch_size] for i in range(0, len(objects), batch_size)]
+
+
+def map_survey_batches(
+    client,
+    json_objects,
+    batch_size=DEFAULT_BATCH_SIZE,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    token_budget=DEFAULT_PROMPT_TOKEN_BUDGET,
+    model=SURVEY_MODEL,
+    max_retries=DEFAULT_MAX_RETRIES,
+    on_progress=None,
+    usage=None,
+):
+    """
+    Generate one partial synthesis per batch, at most `max_concurrency` at a
+    time. Returns the partials in batch order. on_progress(done, total) is
+    called from the calling thread as batches finish; token usage is added
+    to `usage` if given.
+    """
+    batches = survey_batches(json_objects, batch_size)
+
+    def run_batch(batch):
+        packed = pack_survey_prompt(batch, token_budget, template=map_prompt_template, model=model)
+        return call_with_retry(
+            lambda: generate_survey(client, packed["messages"], model=model, max_tokens=MAP_MAX_TOKENS, usage=usage),
+            max_retries=max_retries,
+        )
+
+    partials = [None] * len(batches)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        futures = {pool.submit(run_batch, batch): i for i, batch in enumerate(batches)}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                partials[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(done, len(batches))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return partials
+
+
+def build_reduce_messages(partials, template=survey_prompt_template):
+    user_content = reduce_prompt_intro.format(count=len(partials)) + "\n\n".join(
+        f"--- Partial synthesis {i} ---\n{text}" for i, text in enumerate(partials, start=1)
+    )
+    return [
+        {"role": "system", "content": SURVEY_SYSTEM_PROMPT},
+        {"role": "user", "content": template + "\n\n" + user_content},
+    ]
+
+
+def survey_request_params(mode, token_budget, batch_size=None, model=SURVEY_MODEL):
+    """Everything besides the papers that shapes a survey; used as the cache key."""
+    params = {
+        "mode": mode,
+        "model": model,
+        "temperature": SURVEY_TEMPERATURE,
+        "max_tokens": SURVEY_MAX_TOKENS,
+        "system_prompt": SURVEY_SYSTEM_PROMPT,
+        "template": survey_prompt_template,
+        "token_budget": token_budget,
+    }
+    if mode == "Map-reduce":
+        params.update({
+            "map_template": map_prompt_template,
+            "reduce_intro": reduce_prompt_intro,
+            "map_max_tokens": MAP_MAX_TOKENS,
+            "batch_size": batch_size,
+        })
+    return params
@@ -0,0 +1,400 @@
+"""
+Generate surveys for many paper selections without the dashboard.
+
+    python survey_batch.py surveys.json --base-url http://localhost:8000/v1
+    python survey_batch.py surveys.json --dry-run
+
+The manifest is JSON. Each selection filters the corpus by facet values
+(topic, year, venue, substage as [stage, substage]), EXHYTE stage or file
+name; "group_by" expands a selection into one per value of a facet:
+
+    {
+      "defaults": {"mode": "auto", "token_budget": 100000},
+      "selections": [
+        {"name": "Biological sciences in 2025", "year": ["2025"], "topic": ["Biological Sciences"]},
+        {"group_by": "year"},
+        {"group_by": "stage", "mode": "Map-reduce", "batch_size": 10}
+      ]
+    }
+
+Finished surveys are written as Markdown to the output directory and
+recorded in its checkpoint, so rerunning the same command resumes an
+interrupted run; a selection is regenerated only when its papers or
+settings change. report.json and report.md give the time and tokens of
+every selection.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from api_clients import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, ClientPool
+from corpus import PaperCorpus, load_full_data
+from exhyte_annotations import AnnotationMatrix, annotation_corpus
+from facets import FacetIndex
+from survey import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_PROMPT_TOKEN_BUDGET,
+    MODEL_PRICES,
+    SURVEY_MODEL,
+    build_reduce_messages,
+    generate_survey,
+    map_survey_batches,
+    pack_survey_prompt,
+    survey_request_params,
+)
+from survey_cache import SurveyCache, survey_cache_key
+
+DEFAULT_WORKERS = 2
+
+SURVEY_MODES = ("auto", "Single request", "Map-reduce")
+
+DEFAULT_SETTINGS = {
+    "mode": "auto",
+    "token_budget": DEFAULT_PROMPT_TOKEN_BUDGET,
+    "batch_size": DEFAULT_BATCH_SIZE,
+    "max_concurrency": DEFAULT_MAX_CONCURRENCY,
+}
+
+FILTER_KEYS = ("topic", "year", "venue", "substage", "stage", "files")
+GROUP_BY = ("topic", "year", "venue", "stage")
+
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+class ManifestError(Exception):
+    pass
+
+
+# ---------------------------------------------------------
+# SELECTIONS
+# ---------------------------------------------------------
+def load_corpus(directory_name="Papers"):
+    """The paper list and its facet index, built as the dashboard builds them."""
+    papers = PaperCorpus(directory_name).refresh()
+    annotations = annotation_corpus().refresh()
+    return papers, FacetIndex(papers, AnnotationMatrix(annotations, papers))
+
+
+def stage_mask(index, stages):
+    """Papers annotated with any substage of the given EXHYTE stages."""
+    keys = [key for key in index.options("substage") if key[0] in stages]
+    mask = np.zeros(len(index), dtype=bool)
+    for key in keys:
+        mask |= index.facet_mask("substage", [key])
+    return mask
+
+
+def select_papers(index, selection):
+    selections = {
+        facet: [tuple(value) if facet == "substage" else str(value) for value in selection.get(facet, [])]
+        for facet in ("topic", "year", "venue", "substage")
+    }
+    base = stage_mask(index, selection["stage"]) if selection.get("stage") else None
+    papers = index.select(selections, base)
+    if selection.get("files"):
+        files = set(selection["files"])
+        papers = [paper for paper in papers if paper.get("filename") in files]
+    return papers
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:80] or "survey"
+
+
+def expand_selections(manifest, index):
+    """
+    One dict per survey to generate: name, slug, papers and settings.
+    Selections with no matching papers are dropped with a warning.
+    """
+    defaults = {**DEFAULT_SETTINGS, **manifest.get("defaults", {})}
+    entries = []
+    for entry in manifest.get("selections", []):
+        unknown = set(entry) - set(FILTER_KEYS) - set(DEFAULT_SETTINGS) - {"name", "group_by"}
+        if unknown:
+            raise ManifestError(f"Unknown selection keys: {', '.join(sorted(unknown))}")
+        group_by = entry.get("group_by")
+        if group_by is None:
+            if not entry.get("name"):
+                raise ManifestError("Every selection needs a name (or a group_by).")
+            entries.append(entry)
+            continue
+        if group_by not in GROUP_BY:
+            raise ManifestError(f"group_by must be one of {', '.join(GROUP_BY)}, not {group_by!r}")
+        if group_by == "stage":
+            values = list(dict.fromkeys(key[0] for key in index.options("substage")))
+        else:
+            values = index.options(group_by)
+        prefix = entry.get("name") or group_by.capitalize()
+        for value in values:
+            expanded = {k: v for k, v in entry.items() if k not in ("group_by", "name")}
+            expanded[group_by] = [value]
+            expanded["name"] = f"{prefix}: {value}"
+            entries.append(expanded)
+
+    selections = []
+    slugs = set()
+    for entry in entries:
+        settings = {key: entry.get(key, defaults[key]) for key in DEFAULT_SETTINGS}
+        if settings["mode"] not in SURVEY_MODES:
+            raise ManifestError(f"mode must be one of {', '.join(SURVEY_MODES)}, not {settings['mode']!r}")
+        papers = select_papers(index, entry)
+        if not papers:
+            print(f"Skipping {entry['name']!r}: no papers match.", file=sys.stderr)
+            continue
+        slug = base_slug = slugify(entry["name"])
+        suffix = 2
+        while slug in slugs:
+            slug = f"{base_slug}-{suffix}"
+            suffix += 1
+        slugs.add(slug)
+        selections.append({"name": entry["name"], "slug": slug, "papers": papers, **settings})
+    return selections
+
+
+def plan_selection(selection, model=SURVEY_MODEL):
+    """
+    Resolve "auto" to a mode (single request when the packed prompt fits the
+    budget) and compute the cache key the dashboard would use for it.
+    """
+    packed = None
+    mode = selection["mode"]
+    if mode != "Map-reduce":
+        packed = pack_survey_prompt([load_full_data(p, cache=False) for p in selection["papers"]], selection["token_budget"])
+        if mode == "auto":
+            mode = "Single request" if packed["fits"] else "Map-reduce"
+    params = survey_request_params(
+        mode, selection["token_budget"], selection["batch_size"] if mode == "Map-reduce" else None, model=model
+    )
+    key = survey_cache_key([p["content_hash"] for p in selection["papers"]], **params)
+    return {"mode": mode, "key": key, "packed": packed if mode == "Single request" else None}
+
+
+# ---------------------------------------------------------
+# CHECKPOINT
+# ---------------------------------------------------------
+class Checkpoint:
+    """{slug: result} of finished selections, rewritten atomically after each one."""
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / CHECKPOINT_NAME
+        self._lock = threading.Lock()
+        try:
+            self.results = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.results = {}
+
+    def finished(self, slug, key):
+        """The stored result when `slug` was finished with the same key and its file is still there."""
+        result = self.results.get(slug)
+        if result and result["key"] == key and (self.path.parent / result["file"]).exists():
+            return result
+        return None
+
+    def record(self, result):
+        with self._lock:
+            self.results[result["slug"]] = result
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.results, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+
+
+# ---------------------------------------------------------
+# RUN
+# ---------------------------------------------------------
+def survey_markdown(selection, mode, output):
+    papers = "\n".join(f"- {p.get('title', p.get('filename'))} ({p.get('year', 'n.d.')})" for p in selection["papers"])
+    return (
+        f"# {selection['name']}\n\n"
+        f"_{len(selection['papers'])} papers · {mode} · generated {time.strftime('%Y-%m-%d %H:%M')}_\n\n"
+        f"{output}\n\n## Papers\n\n{papers}\n"
+    )
+
+
+def run_selection(selection, client, output_dir, checkpoint, cache=None, model=SURVEY_MODEL):
+    """Generate (or reuse) one survey, write its Markdown and checkpoint it; returns its result."""
+    started = time.perf_counter()
+    plan = plan_selection(selection, model)
+    result = {
+        "name": selection["name"],
+        "slug": selection["slug"],
+        "key": plan["key"],
+        "file": f"{selection['slug']}.md",
+        "papers": len(selection["papers"]),
+        "mode": plan["mode"],
+        "source": "generated",
+        "requests": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+    }
+    previous = checkpoint.finished(selection["slug"], plan["key"])
+    if previous:
+        return {**previous, "source": "checkpoint"}
+
+    cached = cache.get(plan["key"]) if cache is not None else None
+    if cached:
+        output = cached["output"]
+        result["source"] = "cache"
+    else:
+        usage = {}
+        if plan["mode"] == "Map-reduce":
+            partials = map_survey_batches(
+                client,
+                [load_full_data(p, cache=False) for p in selection["papers"]],
+                batch_size=selection["batch_size"],
+                max_concurrency=selection["max_concurrency"],
+                token_budget=selection["token_budget"],
+                model=model,
+                max_retries=0,
+                usage=usage,
+            )
+            messages = build_reduce_messages(partials)
+        elif not plan["packed"]["fits"]:
+            raise ValueError("the papers do not fit the prompt budget; use Map-reduce or raise token_budget")
+        else:
+            messages = plan["packed"]["messages"]
+        output = generate_survey(client, messages, model=model, usage=usage)
+        result.update(usage)
+        if cache is not None:
+            cache.put(plan["key"], output, meta={"titles": [p.get("title") for p in selection["papers"]], "mode": plan["mode"]})
+
+    path = Path(output_dir) / result["file"]
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(survey_markdown(selection, plan["mode"], output), encoding="utf-8")
+    tmp.replace(path)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    checkpoint.record(result)
+    return result
+
+
+def run_batch(selections, client, output_dir, workers=DEFAULT_WORKERS, cache=None, model=SURVEY_MODEL):
+    """
+    Run every selection on a pool of `workers` threads. Results and failures
+    are returned in manifest order; an interrupt stops queued selections and
+    keeps what has finished.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(output_dir)
+    results = [None] * len(selections)
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="survey-batch")
+    futures = {
+        pool.submit(run_selection, selection, client, output_dir, checkpoint, cache, model): i
+        for i, selection in enumerate(selections)
+    }
+    try:
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                results[i] = {"name": selections[i]["name"], "slug": selections[i]["slug"], "error": f"{type(e).__name__}: {e}"}
+            status = results[i].get("error") or results[i]["source"]
+            print(f"[{done}/{len(selections)}] {selections[i]['name']}: {status}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted; finished surveys are checkpointed, rerun to resume.", file=sys.stderr)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return results
+
+
+# ---------------------------------------------------------
+# REPORT
+# ---------------------------------------------------------
+def write_report(results, output_dir, seconds, model=SURVEY_MODEL):
+    finished = [r for r in results if r and not r.get("error")]
+    totals = {
+        "selections": len(results),
+        "finished": len(finished),
+        "failed": sum(1 for r in results if r and r.get("error")),
+        "seconds": round(seconds, 3),
+        "requests": sum(r.get("requests", 0) for r in finished if r["source"] == "generated"),
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in finished if r["source"] == "generated"),
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in finished if r["source"] == "generated"),
+    }
+    if model in MODEL_PRICES:
+        input_price, output_price = MODEL_PRICES[model]
+        totals["cost_usd"] = round((totals["prompt_tokens"] * input_price + totals["completion_tokens"] * output_price) / 1_000_000, 4)
+    output_dir = Path(output_dir)
+    (output_dir / "report.json").write_text(json.dumps({"model": model, "totals": totals, "selections": results}, indent=2), encoding="utf-8")
+
+    lines = [
+        "# Survey batch report",
+        "",
+        f"{totals['finished']} of {totals['selections']} surveys in {totals['seconds']:.1f}s, "
+        f"{totals['requests']} requests, {totals['prompt_tokens']:,} prompt + {totals['completion_tokens']:,} completion tokens"
+        + (f" (≈ ${totals['cost_usd']:.2f})" if "cost_usd" in totals else "") + ".",
+        "",
+        "| Selection | Papers | Mode | Source | Seconds | Prompt tokens | Completion tokens |",
+        "|---|---:|---|---|---:|---:|---:|",
+    ]
+    for r in results:
+        if r is None:
+            continue
+        if r.get("error"):
+            lines.append(f"| {r['name']} | | | error: {r['error']} | | | |")
+        else:
+            lines.append(
+                f"| [{r['name']}]({r['file']}) | {r['papers']} | {r['mode']} | {r['source']} | {r.get('seconds', 0):.1f} "
+                f"| {r['prompt_tokens']:,} | {r['completion_tokens']:,} |"
+            )
+    (output_dir / "report.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("manifest", type=Path, help="JSON manifest of selections")
+    parser.add_argument("--output-dir", type=Path, help="where surveys, checkpoint and report go (default: <manifest>_surveys/)")
+    parser.add_argument("--papers", default="Papers", help="papers directory")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"), help="OpenAI-compatible API base URL")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"), help="API key (default: $OPENAI_API_KEY)")
+    parser.add_argument("--model", default=SURVEY_MODEL)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="selections generated at once")
+    parser.add_argument("--rpm", type=int, default=int(os.environ.get("OPENAI_RPM", DEFAULT_REQUESTS_PER_MINUTE)))
+    parser.add_argument("--tpm", type=int, default=int(os.environ.get("OPENAI_TPM", DEFAULT_TOKENS_PER_MINUTE)))
+    parser.add_argument("--no-cache", action="store_true", help="neither reuse nor store surveys in the shared survey cache")
+    parser.add_argument("--dry-run", action="store_true", help="list the selections and their prompt sizes, then exit")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = json.loads(args.manifest.read_text(encoding="utf-8"))
+        papers, index = load_corpus(args.papers)
+        selections = expand_selections(manifest, index)
+    except (OSError, ValueError, ManifestError) as e:
+        parser.error(str(e))
+    print(f"{len(selections)} selections over {len(papers)} papers.", file=sys.stderr)
+
+    if args.dry_run:
+        for selection in selections:
+            plan = plan_selection(selection, args.model)
+            size = f"{plan['packed']['prompt_tokens']:,} prompt tokens" if plan["packed"] else "batched"
+            print(f"{selection['slug']:<40} {len(selection['papers']):>5} papers  {plan['mode']:<15} {size}")
+        return 0
+    if not args.api_key:
+        parser.error("set OPENAI_API_KEY or pass --api-key")
+
+    output_dir = args.output_dir or args.manifest.with_name(f"{args.manifest.stem}_surveys")
+    client = ClientPool(args.rpm, args.tpm).get(args.api_key, args.base_url)
+    cache = None if args.no_cache else SurveyCache()
+    started = time.perf_counter()
+    try:
+        results = run_batch(selections, client, output_dir, args.workers, cache, args.model)
+    except KeyboardInterrupt:
+        return 130
+    totals = write_report(results, output_dir, time.perf_counter() - started, args.model)
+    print(f"Wrote {totals['finished']} surveys and report.md to {output_dir}", file=sys.stderr)
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import contextlib
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+CACHE_PATH = BASE_DIR / ".cache" / "surveys.sqlite3"
+
+# Eviction: entries older than MAX_AGE_SECONDS are dropped, then the least
+# recently used ones until the stored outputs fit in MAX_BYTES.
+MAX_AGE_SECONDS = 30 * 24 * 3600
+MAX_BYTES = 50 * 1024 * 1024
+
+
+def survey_cache_key(content_hashes, **params):
+    """
+    Key for a survey request: the sorted content hashes of the selected papers
+    plus everything else that shapes the output (templates, model, temperature,
+    mode, ...). Selection order does not change the key.
+    """
+    payload = json.dumps(
+        {"papers": sorted(content_hashes), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SurveyCache:
+    """Generated surveys in SQLite, shared by every session and process."""
+
+    def __init__(self, path=CACHE_PATH, max_age=MAX_AGE_SECONDS, max_bytes=MAX_BYTES):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS surveys (
+                    key TEXT PRIMARY KEY,
+                    output TEXT NOT NULL,
+                    meta TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One transaction per block: committed (or rolled back) and closed on exit.
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return {"output", "meta", "created_at"} for a fresh entry, else None."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT output, meta, created_at FROM surveys WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE surveys SET last_used = ? WHERE key = ?", (now, key))
+        return {"output": row[0], "meta": json.loads(row[1]), "created_at": row[2]}
+
+    def put(self, key, output, meta=None):
+        now = time.time()
+        size = len(output.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO surveys (key, output, meta, size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, output, json.dumps(meta or {}), size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM surveys WHERE created_at < ?", (now - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM surveys").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM surveys ORDER BY last_used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM surveys WHERE key = ?", (key,))
+            total -= size
@@ -0,0 +1,310 @@
+import contextlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from survey import (
+    DEFAULT_MAX_RETRIES,
+    build_reduce_messages,
+    generate_survey,
+    map_survey_batches,
+    stream_survey,
+)
+
+BASE_DIR = Path(__file__).resolve().parent
+
+JOBS_PATH = BASE_DIR / ".cache" / "survey_jobs.sqlite3"
+
+# Surveys generated at once, and jobs (queued + running) accepted before new
+# submissions are refused. Each map-reduce job adds its own batch threads.
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_QUEUED = 16
+
+# Finished jobs are kept this long, so results survive reruns and reconnects.
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Minimum seconds between writes of a running job's partial output.
+FLUSH_INTERVAL = 1.0
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ---------------------------------------------------------
+# JOB HANDLE
+# ---------------------------------------------------------
+class SurveyJob:
+    """What a job function sees of its job: progress, output and cancellation."""
+
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self.id = job_id
+
+    @property
+    def cancelled(self):
+        return self._queue._live_value(self.id, "cancel_requested", False)
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def set_progress(self, fraction=None, text=""):
+        """Report progress; a fraction of None keeps the previous one."""
+        fields = {"progress_text": text}
+        if fraction is not None:
+            fields["progress"] = fraction
+        self._queue._update(self.id, **fields)
+
+    def append_output(self, text):
+        self._queue._update(self.id, append=text)
+
+
+# ---------------------------------------------------------
+# QUEUE
+# ---------------------------------------------------------
+class SurveyJobQueue:
+    """
+    Survey jobs run on a bounded thread pool, independent of any script run.
+
+    Job state lives in SQLite, so status and results can be fetched by job id
+    from any session, after reruns, reconnects and restarts. Queued and
+    running jobs are also kept in memory; their partial output is flushed to
+    disk at most every FLUSH_INTERVAL seconds. API clients are only held in
+    memory, so jobs that were still active when the process stopped are
+    marked "interrupted".
+    """
+
+    def __init__(self, path=JOBS_PATH, max_workers=DEFAULT_MAX_WORKERS, max_queued=DEFAULT_MAX_QUEUED, retention=JOB_RETENTION_SECONDS):
+        self.path = Path(path)
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="survey-job")
+        self._live = {}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    meta TEXT NOT NULL,
+                    output TEXT NOT NULL DEFAULT '',
+                    error TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    progress_text TEXT NOT NULL DEFAULT '',
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'interrupted', finished_at = ? WHERE status IN (?, ?)",
+                (time.time(), *ACTIVE_STATUSES),
+            )
+            conn.execute("DELETE FROM jobs WHERE created_at < ?", (time.time() - retention,))
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One transaction per block: committed (or rolled back) and closed on exit.
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Public API ---
+    def submit(self, fn, meta=None):
+        """
+        Queue fn(job) and return the new job id. fn returns the survey text;
+        it may call job.append_output() as text arrives and should call
+        job.check_cancelled() regularly. Raises QueueFull when max_queued
+        jobs are already waiting or running.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            if len(self._live) >= self.max_queued:
+                raise QueueFull(f"{len(self._live)} survey jobs are already queued or running.")
+            self._live[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "meta": meta or {},
+                "output": "",
+                "error": None,
+                "progress": 0.0,
+                "progress_text": "",
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "cancel_requested": False,
+                "flushed_at": 0.0,
+            }
+            self._persist(job_id)
+        self._pool.submit(self._run, job_id, fn)
+        return job_id
+
+    def get(self, job_id):
+        """Job state as a dict (status, output, progress, ...), or None for an unknown id."""
+        with self._lock:
+            state = self._live.get(job_id)
+            if state is not None:
+                job = {k: v for k, v in state.items() if k not in ("cancel_requested", "flushed_at")}
+                if job["status"] == "queued":
+                    job["position"] = 1 + sum(
+                        1 for other in self._live.values()
+                        if other["status"] == "queued" and other["created_at"] < state["created_at"]
+                    )
+                return job
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["meta"] = json.loads(job["meta"])
+        return job
+
+    def cancel(self, job_id):
+        """Ask a queued or running job to stop; its partial output is kept."""
+        with self._lock:
+            state = self._live.get(job_id)
+            if state is not None:
+                state["cancel_requested"] = True
+
+    def active_count(self):
+        with self._lock:
+            return len(self._live)
+
+    # --- Worker side ---
+    def _live_value(self, job_id, key, default=None):
+        with self._lock:
+            return self._live.get(job_id, {}).get(key, default)
+
+    def _update(self, job_id, append=None, **fields):
+        with self._lock:
+            state = self._live.get(job_id)
+            if state is None:
+                return
+            state.update(fields)
+            if append:
+                state["output"] += append
+            if time.monotonic() - state["flushed_at"] >= FLUSH_INTERVAL:
+                self._persist(job_id)
+
+    def _run(self, job_id, fn):
+        with self._lock:
+            state = self._live[job_id]
+            cancelled = state["cancel_requested"]
+            if not cancelled:
+                state.update(status="running", started_at=time.time())
+                self._persist(job_id)
+        fields = {}
+        try:
+            if cancelled:
+                raise JobCancelled()
+            output = fn(SurveyJob(self, job_id))
+            fields = {"status": "done", "output": output, "progress": 1.0}
+        except JobCancelled:
+            fields = {"status": "cancelled"}
+        except Exception as e:
+            fields = {"status": "error", "error": str(e)}
+        finally:
+            with self._lock:
+                state.update(fields, finished_at=time.time())
+                self._persist(job_id)
+                del self._live[job_id]
+
+    def _persist(self, job_id):
+        # Called with self._lock held.
+        state = self._live[job_id]
+        state["flushed_at"] = time.monotonic()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO jobs
+                    (id, status, meta, output, error, progress, progress_text, created_at, started_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id, state["status"], json.dumps(state["meta"]), state["output"], state["error"],
+                    state["progress"], state["progress_text"], state["created_at"],
+                    state["started_at"], state["finished_at"],
+                ),
+            )
+
+
+# ---------------------------------------------------------
+# SURVEY JOBS
+# ---------------------------------------------------------
+def survey_job(
+    client,
+    messages=None,
+    json_objects=None,
+    stream=True,
+    batch_size=None,
+    max_concurrency=None,
+    token_budget=None,
+    cache=None,
+    cache_key=None,
+    cache_meta=None,
+    max_retries=DEFAULT_MAX_RETRIES,
+):
+    """
+    Job function for SurveyJobQueue.submit(). With `json_objects` the papers
+    are first summarized in batches (map-reduce); otherwise `messages` is the
+    packed single-request prompt. A finished survey is stored in `cache`.
+    Pass max_retries=0 for clients that retry on their own (api_clients).
+    """
+
+    def run(job):
+        survey_messages = messages
+        if json_objects is not None:
+            def on_progress(done, total):
+                job.check_cancelled()
+                job.set_progress(done / (total + 1), f"Summarized {done} of {total} batches")
+
+            job.set_progress(0.0, "Summarizing paper batches...")
+            partials = map_survey_batches(
+                client,
+                json_objects,
+                batch_size=batch_size,
+                max_concurrency=max_concurrency,
+                token_budget=token_budget,
+                max_retries=max_retries,
+                on_progress=on_progress,
+            )
+            survey_messages = build_reduce_messages(partials)
+
+        job.check_cancelled()
+        job.set_progress(text="Writing the survey...")
+        if stream:
+            parts = []
+            for delta in stream_survey(client, survey_messages):
+                parts.append(delta)
+                job.append_output(delta)
+                job.check_cancelled()
+            output = "".join(parts).strip()
+        else:
+            output = generate_survey(client, survey_messages)
+
+        if cache is not None and cache_key:
+            cache.put(cache_key, output, meta=cache_meta)
+        return output
+
+    return run
@@ -0,0 +1,94 @@
+/*
+ * Streamlit component around PaperList (paper_list.js, loaded before this
+ * file). Filtering, search and paging never leave the browser; Python is
+ * called only to render a summary, to run a semantic search and to keep
+ * the Survey Generator's selection in sync.
+ *
+ * data: {
+ *   version,                       // remount when the corpus changes
+ *   papers_url | papers,           // paper payload, by URL or inline
+ *   search_url | search,           // search payload, by URL or inline
+ *   summaries: {filename: html},   // answers to "summary" triggers
+ *   semantic: {query: [filename]}, // answers to "semantic" triggers, or null
+ *   survey_selection: [filename],
+ * }
+ */
+const payloads = new Map();
+const views = new WeakMap();
+
+function loadPayload(url, inline) {
+  if (!url) return Promise.resolve(inline);
+  if (!payloads.has(url)) {
+    payloads.set(url, fetch(url).then((response) => {
+      if (!response.ok) throw new Error(`${url}: ${response.status}`);
+      return response.json();
+    }).catch((error) => {
+      payloads.delete(url);
+      throw error;
+    }));
+  }
+  return payloads.get(url);
+}
+
+// Requests answered by a later render: resolved once `data[field][key]` arrives.
+function settle(pending, answers) {
+  for (const [key, entry] of pending) {
+    if (answers && key in answers) {
+      pending.delete(key);
+      entry.resolve(answers[key]);
+    }
+  }
+}
+
+// Asking again for a key still in flight reuses its promise.
+function request(pending, key, send) {
+  if (!pending.has(key)) {
+    const entry = {};
+    entry.promise = new Promise((resolve) => {
+      entry.resolve = resolve;
+    });
+    pending.set(key, entry);
+    send(key);
+  }
+  return pending.get(key).promise;
+}
+
+export default function (component) {
+  const { data, parentElement, setStateValue, setTriggerValue } = component;
+  let view = views.get(parentElement);
+  if (!view || view.version !== data.version) {
+    if (view) view.root.remove();
+    const root = document.createElement("div");
+    root.textContent = "Loading…";
+    parentElement.appendChild(root);
+    view = { version: data.version, root, list: null, summaries: new Map(), semantic: new Map(), data };
+    views.set(parentElement, view);
+    const current = view;
+    loadPayload(data.papers_url, data.papers).then((payload) => {
+      if (views.get(parentElement) !== current) return;
+      root.textContent = "";
+      current.list = PaperList.mount(root, {
+        payload,
+        loadSearch: () => loadPayload(current.data.search_url, current.data.search),
+        loadSummary: (paper) => {
+          const answers = current.data.summaries || {};
+          if (paper.f in answers) return answers[paper.f];
+          return request(current.summaries, paper.f, (key) => setTriggerValue("summary", key));
+        },
+        semanticSearch: current.data.semantic === null ? undefined : (query) => {
+          const answers = current.data.semantic || {};
+          if (query in answers) return answers[query];
+          return request(current.semantic, query, (key) => setTriggerValue("semantic", key));
+        },
+        onSurveyChange: (filenames) => setStateValue("survey_selection", filenames),
+        surveySelection: current.data.survey_selection,
+      });
+    }).catch(() => {
+      root.textContent = "The paper list could not be loaded.";
+    });
+  }
+  view.data = data;
+  settle(view.summaries, data.summaries);
+  settle(view.semantic, data.semantic);
+  if (view.list) view.list.setSurveySelection(data.survey_selection);
+}
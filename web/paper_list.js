@@ -0,0 +1,520 @@
+/*
+ * Client-side Paper List: facet filters with live counts, keyword search,
+ * paging, summaries and related papers, all computed in the browser from
+ * the payloads built by paper_payload.py.
+ *
+ * Keyword queries follow search_index.py: terms are ANDed, OR (or |)
+ * separates alternatives, field:term restricts a term to one section,
+ * terms match word prefixes unless quoted, and hits are ranked by BM25.
+ *
+ *   PaperList.mount(element, {
+ *     payload: <paper payload>,
+ *     loadSearch: () => Promise<search payload>,   // fetched on the first search
+ *     loadSummary: (paper) => Promise<html>,       // fetched when a summary is opened
+ *     // optional:
+ *     semanticSearch: (query) => Promise<[filename, ...]>,  // adds "Match by meaning"
+ *     onSurveyChange: (filenames) => void,         // adds survey selection buttons
+ *     surveySelection: [filename, ...],
+ *   });
+ */
+(function (global) {
+  "use strict";
+
+  var PAGE_SIZES = [10, 25, 50, 100];
+  var DEFAULT_PAGE_SIZE = 25;
+  var FACET_LABELS = {
+    topic: "Search by Topic",
+    year: "Publication Year",
+    venue: "Venue",
+    substage: "Search by EXHYTE Substage",
+  };
+
+  function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, function (c) {
+      return { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;" }[c];
+    });
+  }
+
+  function tokenize(text) {
+    return text.toLowerCase().match(/[a-z0-9]+/g) || [];
+  }
+
+  // Returns text -> HTML with the query's terms wrapped in <mark>.
+  function highlighter(query, fields) {
+    var patterns = [];
+    parseQuery(query, fields).forEach(function (group) {
+      group.forEach(function (term) {
+        patterns.push(term[2] ? term[1] + "(?![a-z0-9])" : term[1] + "[a-z0-9]*");
+      });
+    });
+    if (!patterns.length) return escapeHtml;
+    var pattern = new RegExp("(?<![a-z0-9])(?:" + patterns.join("|") + ")", "gi");
+    return function (text) {
+      var html = "", last = 0;
+      String(text).replace(pattern, function (match, offset) {
+        html += escapeHtml(String(text).slice(last, offset)) + "<mark>" + escapeHtml(match) + "</mark>";
+        last = offset + match.length;
+        return match;
+      });
+      return html + escapeHtml(String(text).slice(last));
+    };
+  }
+
+  // ---------------------------------------------------------
+  // SEARCH (mirrors search_index.py)
+  // ---------------------------------------------------------
+  function parseQuery(query, fields) {
+    var groups = [[]];
+    (query.match(/(?:\w+:)?"[^"]*"|\S+/g) || []).forEach(function (raw) {
+      if (raw === "OR" || raw === "|") {
+        if (groups[groups.length - 1].length) groups.push([]);
+        return;
+      }
+      var field = null;
+      var colon = raw.indexOf(":");
+      if (colon >= 0 && raw[0] !== '"') {
+        var prefix = raw.slice(0, colon).toLowerCase();
+        if (fields.indexOf(prefix) >= 0) {
+          field = fields.indexOf(prefix);
+          raw = raw.slice(colon + 1);
+        }
+      }
+      var exact = raw[0] === '"';
+      tokenize(raw.replace(/^["*]+|["*]+$/g, "")).forEach(function (token) {
+        groups[groups.length - 1].push([field, token, exact]);
+      });
+    });
+    return groups.filter(function (group) { return group.length; });
+  }
+
+  function SearchIndex(data, papers) {
+    this.data = data;
+    this.papers = papers;
+    this.terms = new Map(data.vocabulary.map(function (term, i) { return [term, i]; }));
+    this.df = new Int32Array(data.vocabulary.length).fill(-1);
+    var total = 0;
+    data.doc_lengths.forEach(function (length) { total += length; });
+    this.avgLength = papers.length ? total / papers.length : 0;
+  }
+
+  SearchIndex.prototype.expand = function (token, exact) {
+    if (exact) return this.terms.has(token) ? [this.terms.get(token)] : [];
+    var vocabulary = this.data.vocabulary;
+    var lo = 0, hi = vocabulary.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (vocabulary[mid] < token) lo = mid + 1; else hi = mid;
+    }
+    var matches = [];
+    while (lo < vocabulary.length && vocabulary[lo].lastIndexOf(token, 0) === 0) matches.push(lo++);
+    return matches;
+  };
+
+  // Calls fn(doc, entries) for every paper in one term's postings; entries
+  // are packed as tf * field_slots + field (see paper_payload.py).
+  SearchIndex.prototype.eachPosting = function (term, fn) {
+    var encoded = this.data.postings[term];
+    var doc = -1;
+    for (var i = 0; i < encoded.length; ) {
+      doc += encoded[i] + 1;
+      var n = encoded[i + 1];
+      fn(doc, encoded.slice(i + 2, i + 2 + n));
+      i += 2 + n;
+    }
+  };
+
+  SearchIndex.prototype.docFrequency = function (term) {
+    if (this.df[term] < 0) {
+      var count = 0;
+      this.eachPosting(term, function () { count++; });
+      this.df[term] = count;
+    }
+    return this.df[term];
+  };
+
+  // Map of paper index -> [[term, tf, fields], ...] for one query term.
+  SearchIndex.prototype.matchTerm = function (field, token, exact) {
+    var hits = new Map();
+    var slots = this.data.field_slots;
+    var self = this;
+    this.expand(token, exact).forEach(function (term) {
+      self.eachPosting(term, function (doc, entries) {
+        var tf = 0, fields = [];
+        entries.forEach(function (entry) {
+          var entryField = entry % slots;
+          if (field === null || entryField === field) {
+            tf += Math.floor(entry / slots);
+            fields.push(entryField);
+          }
+        });
+        if (!fields.length) return;
+        if (!hits.has(doc)) hits.set(doc, []);
+        hits.get(doc).push([term, tf, fields]);
+      });
+    });
+    return hits;
+  };
+
+  // [{doc, score, fields}] ranked by BM25, best first.
+  SearchIndex.prototype.search = function (query) {
+    var self = this;
+    var k1 = this.data.bm25[0], b = this.data.bm25[1];
+    var nDocs = this.papers.length;
+    var scores = new Map(), hitFields = new Map();
+    parseQuery(query, this.data.fields).forEach(function (group) {
+      var matched = null, groupHits = [];
+      for (var g = 0; g < group.length; g++) {
+        var termHits = self.matchTerm(group[g][0], group[g][1], group[g][2]);
+        matched = matched === null
+          ? new Set(termHits.keys())
+          : new Set(Array.from(matched).filter(function (doc) { return termHits.has(doc); }));
+        groupHits.push(termHits);
+        if (!matched.size) break;
+      }
+      (matched || new Set()).forEach(function (doc) {
+        var norm = k1 * (1 - b + b * (self.data.doc_lengths[doc] || 1) / (self.avgLength || 1));
+        var score = 0;
+        if (!hitFields.has(doc)) hitFields.set(doc, new Set());
+        groupHits.forEach(function (termHits) {
+          termHits.get(doc).forEach(function (hit) {
+            var df = self.docFrequency(hit[0]);
+            var idf = Math.log(1 + (nDocs - df + 0.5) / (df + 0.5));
+            score += idf * hit[1] * (k1 + 1) / (hit[1] + norm);
+            hit[2].forEach(function (field) { hitFields.get(doc).add(field); });
+          });
+        });
+        scores.set(doc, Math.max(scores.get(doc) || 0, score));
+      });
+    });
+    var papers = this.papers;
+    return Array.from(scores.entries())
+      .sort(function (x, y) {
+        if (y[1] !== x[1]) return y[1] - x[1];
+        return papers[x[0]].f < papers[y[0]].f ? -1 : papers[x[0]].f > papers[y[0]].f ? 1 : 0;
+      })
+      .map(function (entry) {
+        return {
+          doc: entry[0],
+          score: entry[1],
+          fields: Array.from(hitFields.get(entry[0])).sort(function (x, y) { return x - y; }),
+        };
+      });
+  };
+
+  // ---------------------------------------------------------
+  // FACETS (mirrors facets.py)
+  // ---------------------------------------------------------
+  function FacetIndex(payload) {
+    var self = this;
+    this.payload = payload;
+    this.order = payload.facet_order;
+    this.docs = {};
+    this.order.forEach(function (facet, f) {
+      var docs = payload.facets[facet].map(function () { return []; });
+      payload.papers.forEach(function (paper, i) {
+        paper.x[f].forEach(function (value) { docs[value].push(i); });
+      });
+      self.docs[facet] = docs;
+    });
+  }
+
+  // Uint8Array row mask of the papers matching every selected facet except `exclude`.
+  FacetIndex.prototype.mask = function (selections, exclude) {
+    var n = this.payload.papers.length;
+    var mask = new Uint8Array(n).fill(1);
+    var self = this;
+    this.order.forEach(function (facet) {
+      var selected = selections[facet];
+      if (facet === exclude || !selected || !selected.length) return;
+      var hits = new Uint16Array(n);
+      selected.forEach(function (value) {
+        self.docs[facet][value].forEach(function (doc) { hits[doc]++; });
+      });
+      var need = self.payload.facet_modes[facet] === "all" ? selected.length : 1;
+      for (var i = 0; i < n; i++) if (hits[i] < need) mask[i] = 0;
+    });
+    return mask;
+  };
+
+  FacetIndex.prototype.counts = function (facet, selections) {
+    var mask = this.mask(selections, facet);
+    var f = this.order.indexOf(facet);
+    var counts = new Int32Array(this.payload.facets[facet].length);
+    this.payload.papers.forEach(function (paper, i) {
+      if (mask[i]) paper.x[f].forEach(function (value) { counts[value]++; });
+    });
+    return counts;
+  };
+
+  // ---------------------------------------------------------
+  // LIST
+  // ---------------------------------------------------------
+  function PaperList(root, options) {
+    this.root = root;
+    this.options = options;
+    this.payload = options.payload;
+    this.papers = this.payload.papers;
+    this.facets = new FacetIndex(this.payload);
+    this.search = null;
+    this.searchLoading = null;
+    this.state = { selections: {}, keyword: "", semantic: false, page: 1, pageSize: DEFAULT_PAGE_SIZE, open: new Set() };
+    this.summaries = new Map();
+    this.semanticResults = new Map();
+    this.rows = new Map(this.papers.map(function (paper, i) { return [paper.f, i]; }));
+    this.surveySelection = new Set(options.surveySelection || []);
+    this.build();
+    this.update();
+  }
+
+  PaperList.prototype.build = function () {
+    var self = this;
+    this.root.classList.add("paper-list");
+    this.root.innerHTML =
+      '<aside class="pl-filters"><h3>Filters</h3><div class="pl-facets"></div>' +
+      '<label class="pl-label">Search by Keyword<input type="search" class="pl-keyword" placeholder="e.g. Creativity..." ' +
+      'title="Terms are combined with AND; use OR between alternatives. Terms match word prefixes; quote a term for an exact word. ' +
+      'Restrict a term to one section with e.g. method:graph or limitations:cost."></label>' +
+      (this.options.semanticSearch
+        ? '<label class="pl-toggle" title="Rank papers whose objective, novelty and method are closest in meaning to the keywords, even without shared words.">' +
+          '<input type="checkbox" class="pl-semantic"> Match by meaning</label>'
+        : "") +
+      '<label class="pl-label">Papers per Page<select class="pl-page-size">' +
+      PAGE_SIZES.map(function (size) {
+        return '<option value="' + size + '"' + (size === DEFAULT_PAGE_SIZE ? " selected" : "") + ">" + size + "</option>";
+      }).join("") +
+      "</select></label></aside>" +
+      '<section class="pl-results"><h3 class="pl-heading"></h3><div class="pl-pager"></div><div class="pl-rows"></div></section>';
+
+    var facetsEl = this.root.querySelector(".pl-facets");
+    this.facetEls = {};
+    this.payload.facet_order.forEach(function (facet) {
+      var details = document.createElement("details");
+      details.className = "pl-facet";
+      details.innerHTML = "<summary>" + escapeHtml(FACET_LABELS[facet] || facet) + '</summary><div class="pl-options"></div>';
+      details.addEventListener("change", function () {
+        self.state.selections[facet] = Array.from(details.querySelectorAll("input:checked")).map(function (input) {
+          return Number(input.value);
+        });
+        self.state.page = 1;
+        self.update();
+      });
+      facetsEl.appendChild(details);
+      self.facetEls[facet] = details;
+    });
+
+    var timer = null;
+    this.root.querySelector(".pl-keyword").addEventListener("input", function (event) {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        self.state.keyword = event.target.value.trim();
+        self.state.page = 1;
+        self.update();
+      }, 120);
+    });
+    if (this.options.semanticSearch) {
+      this.root.querySelector(".pl-semantic").addEventListener("change", function (event) {
+        self.state.semantic = event.target.checked;
+        self.state.page = 1;
+        self.update();
+      });
+    }
+    this.root.querySelector(".pl-page-size").addEventListener("change", function (event) {
+      self.state.pageSize = Number(event.target.value);
+      self.state.page = 1;
+      self.update();
+    });
+    this.root.querySelector(".pl-pager").addEventListener("change", function (event) {
+      self.state.page = Number(event.target.value);
+      self.renderRows();
+    });
+    this.root.querySelector(".pl-rows").addEventListener("click", function (event) {
+      var button = event.target.closest("[data-summary]");
+      if (button) self.toggleSummary(Number(button.getAttribute("data-summary")));
+      var survey = event.target.closest("[data-survey]");
+      if (survey) self.toggleSurvey(Number(survey.getAttribute("data-survey")));
+    });
+  };
+
+  PaperList.prototype.formatValue = function (facet, value) {
+    return facet === "substage" ? value[0] + " › " + value[1] : String(value);
+  };
+
+  PaperList.prototype.renderFacets = function () {
+    var self = this;
+    this.payload.facet_order.forEach(function (facet) {
+      var counts = self.facets.counts(facet, self.state.selections);
+      var selected = new Set(self.state.selections[facet] || []);
+      self.facetEls[facet].querySelector(".pl-options").innerHTML = self.payload.facets[facet].map(function (value, i) {
+        return '<label><input type="checkbox" value="' + i + '"' + (selected.has(i) ? " checked" : "") + "> " +
+          escapeHtml(self.formatValue(facet, value)) + ' <span class="pl-count">(' + counts[i] + ")</span></label>";
+      }).join("");
+    });
+  };
+
+  PaperList.prototype.ensureSearch = function () {
+    var self = this;
+    if (!this.searchLoading) {
+      this.searchLoading = Promise.resolve(this.options.loadSearch()).then(function (data) {
+        self.search = new SearchIndex(data, self.papers);
+      });
+    }
+    return this.searchLoading;
+  };
+
+  PaperList.prototype.update = function () {
+    var self = this;
+    this.renderFacets();
+    var mask = this.facets.mask(this.state.selections);
+    var keyword = this.state.keyword;
+    if (!keyword) {
+      this.results = [];
+      for (var i = 0; i < this.papers.length; i++) if (mask[i]) this.results.push({ doc: i, fields: null });
+    } else if (this.state.semantic) {
+      var ranked = this.semanticResults.get(keyword);
+      if (ranked === undefined) {
+        this.results = null;
+        this.semanticResults.set(keyword, null);
+        Promise.resolve(this.options.semanticSearch(keyword)).then(function (filenames) {
+          self.semanticResults.set(keyword, filenames);
+        }, function () {
+          self.semanticResults.delete(keyword);
+        }).then(function () {
+          if (self.state.keyword === keyword && self.state.semantic) self.update();
+        });
+      } else if (ranked === null) {
+        this.results = null;
+      } else {
+        this.results = ranked
+          .map(function (filename) { return self.rows.get(filename); })
+          .filter(function (doc) { return doc !== undefined && mask[doc]; })
+          .map(function (doc) { return { doc: doc, fields: null }; });
+      }
+    } else if (!this.search) {
+      this.results = null;
+      this.ensureSearch().then(function () { self.update(); }, function () {
+        self.searchLoading = null;
+        self.root.querySelector(".pl-rows").innerHTML = '<p class="pl-info">The search index could not be loaded.</p>';
+      });
+    } else {
+      this.results = this.search.search(this.state.keyword).filter(function (hit) { return mask[hit.doc]; });
+    }
+    this.renderRows();
+  };
+
+  PaperList.prototype.renderRows = function () {
+    var heading = this.root.querySelector(".pl-heading");
+    var pager = this.root.querySelector(".pl-pager");
+    var rowsEl = this.root.querySelector(".pl-rows");
+    if (this.results === null) {
+      heading.textContent = "References & Papers";
+      rowsEl.innerHTML = '<p class="pl-info">Searching…</p>';
+      return;
+    }
+    var total = this.results.length;
+    heading.textContent = "References & Papers (" + total + ")";
+    var size = this.state.pageSize;
+    var pages = Math.max(1, Math.ceil(total / size));
+    this.state.page = Math.min(this.state.page, pages);
+    var start = (this.state.page - 1) * size;
+    var pageResults = this.results.slice(start, start + size);
+
+    pager.innerHTML = pages > 1
+      ? '<span class="pl-info">Showing ' + (start + 1) + "–" + (start + pageResults.length) + " of " + total +
+        '</span> <label>Page <select>' +
+        Array.from({ length: pages }, function (_, i) {
+          return '<option value="' + (i + 1) + '"' + (i + 1 === this.state.page ? " selected" : "") + ">" + (i + 1) + "</option>";
+        }, this).join("") + "</select> of " + pages + "</label>"
+      : "";
+
+    if (!total) {
+      rowsEl.innerHTML = '<p class="pl-info">' + (this.papers.length ? "No papers found matching criteria." : "No papers available.") + "</p>";
+      return;
+    }
+    var fieldLabels = this.search ? this.search.data.field_labels : [];
+    var mark = this.state.keyword && !this.state.semantic && this.search
+      ? highlighter(this.state.keyword, this.search.data.fields)
+      : escapeHtml;
+    var self = this;
+    rowsEl.innerHTML = pageResults.map(function (hit, i) {
+      var paper = self.papers[hit.doc];
+      var matched = hit.fields
+        ? '<div class="pl-matched">Matched in: ' + hit.fields.map(function (f) { return escapeHtml(fieldLabels[f]); }).join(", ") + "</div>"
+        : "";
+      var link = paper.u
+        ? '<a class="pl-button" href="' + escapeHtml(paper.u) + '" target="_blank" rel="noopener" title="Go to Source">🔗</a>'
+        : '<span class="pl-button pl-disabled" title="No source link available">🔗</span>';
+      return '<div class="pl-row"><div class="pl-number">' + (start + i + 1) + '</div><div class="pl-content">' +
+        '<div class="pl-title">' + mark(paper.t) + "</div>" +
+        '<div class="pl-authors">' + mark(paper.a) + " (" + escapeHtml(paper.y) + ")</div>" +
+        '<div class="pl-venue">' + escapeHtml(paper.v) + "</div>" + matched + "</div>" +
+        '<div class="pl-buttons"><button class="pl-button" data-summary="' + hit.doc + '" title="View Summary">📄</button>' + link +
+        self.surveyButton(hit.doc) + "</div>" +
+        '<div class="pl-detail" data-detail="' + hit.doc + '">' + (self.state.open.has(hit.doc) ? self.detailHtml(hit.doc) : "") + "</div></div>";
+    }).join("");
+  };
+
+  PaperList.prototype.surveyButton = function (doc) {
+    if (!this.options.onSurveyChange) return "";
+    var selected = this.surveySelection.has(this.papers[doc].f);
+    return '<button class="pl-button' + (selected ? " pl-selected" : "") + '" data-survey="' + doc + '" title="' +
+      (selected ? "Remove from the survey selection" : "Add to the survey selection") + '">' + (selected ? "✓" : "➕") + "</button>";
+  };
+
+  PaperList.prototype.toggleSurvey = function (doc) {
+    var filename = this.papers[doc].f;
+    if (this.surveySelection.has(filename)) this.surveySelection.delete(filename);
+    else this.surveySelection.add(filename);
+    this.options.onSurveyChange(Array.from(this.surveySelection));
+    this.renderRows();
+  };
+
+  // Survey selection made elsewhere (e.g. in the Survey Generator).
+  PaperList.prototype.setSurveySelection = function (filenames) {
+    var next = new Set(filenames || []);
+    if (next.size === this.surveySelection.size && Array.from(next).every(function (f) { return this.has(f); }, this.surveySelection)) return;
+    this.surveySelection = next;
+    this.renderRows();
+  };
+
+  PaperList.prototype.detailHtml = function (doc) {
+    var self = this;
+    var summary = this.summaries.get(doc);
+    var html = '<div class="pl-summary">' + (summary === undefined ? "Loading summary…" : summary) + "</div>";
+    var related = (this.papers[doc].r || []).map(function (entry) {
+      var other = self.papers[entry[0]];
+      var title = escapeHtml(other.t);
+      if (other.u) title = '<a href="' + escapeHtml(other.u) + '" target="_blank" rel="noopener">' + title + "</a>";
+      return "<li>" + title + ' <span class="pl-count">(' + escapeHtml(other.y) + " · " + Math.round(entry[1] * 100) + "% similar)</span></li>";
+    });
+    if (related.length) html += '<div class="pl-related"><strong>🔎 Related papers</strong><ul>' + related.join("") + "</ul></div>";
+    return html;
+  };
+
+  PaperList.prototype.toggleSummary = function (doc) {
+    var self = this;
+    var detail = this.root.querySelector('[data-detail="' + doc + '"]');
+    if (this.state.open.has(doc)) {
+      this.state.open.delete(doc);
+      detail.innerHTML = "";
+      return;
+    }
+    this.state.open.add(doc);
+    detail.innerHTML = this.detailHtml(doc);
+    if (this.summaries.has(doc)) return;
+    Promise.resolve(this.options.loadSummary(this.papers[doc]))
+      .then(function (html) { self.summaries.set(doc, html); })
+      .catch(function () { self.summaries.set(doc, '<em>The summary could not be loaded.</em>'); })
+      .then(function () {
+        var current = self.root.querySelector('[data-detail="' + doc + '"]');
+        if (current && self.state.open.has(doc)) current.innerHTML = self.detailHtml(doc);
+      });
+  };
+
+  global.PaperList = {
+    mount: function (root, options) { return new PaperList(root, options); },
+    parseQuery: parseQuery,
+    highlighter: highlighter,
+    SearchIndex: SearchIndex,
+    FacetIndex: FacetIndex,
+  };
+})(window);